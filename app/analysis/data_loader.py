@@ -0,0 +1,328 @@
+"""
+Zdieľané načítanie zdravotných dát (OCR JSON + Manuálne + Apple Health)
+Jedna cache DataFrame pre všetky analyzery + parquet sidecar pre JSON súbory
+"""
+import json
+import logging
+import threading
+import time
+import pandas as pd
+from sqlalchemy import text
+
+from app.config import settings
+from app.database import get_session
+
+logger = logging.getLogger(__name__)
+
+# Sidecar cache vedľa JSON súborov
+PARQUET_CACHE_PATH = settings.PROCESSED_DATA_DIR / "extracted_cache.parquet"
+
+# Mapovanie Apple Health typov na naše metriky
+APPLE_TO_METRIC_MAP = {
+    'HKQuantityTypeIdentifierBodyMass': 'weight',
+    'HKQuantityTypeIdentifierHeight': 'height',
+    'HKQuantityTypeIdentifierHeartRate': 'heart_rate',
+    'HKQuantityTypeIdentifierBloodPressureSystolic': 'blood_pressure_systolic',
+    'HKQuantityTypeIdentifierBloodPressureDiastolic': 'blood_pressure_diastolic',
+    'HKQuantityTypeIdentifierBodyMassIndex': 'bmi',
+    'HKQuantityTypeIdentifierBloodGlucose': 'glucose',
+}
+
+
+def _to_float(value):
+    """Convert value to float, handling comma decimal and non-numeric gracefully."""
+    if value is None:
+        return None
+    try:
+        return float(str(value).replace(',', '.'))
+    except Exception:
+        return None
+
+
+def _json_files():
+    """Všetky extrahované JSON súbory"""
+    return sorted(settings.PROCESSED_DATA_DIR.glob("extracted_data_*.json"))
+
+
+def _load_json_files(files) -> pd.DataFrame:
+    """Načíta a spojí všetky JSON súbory do DataFrame (pomalá cesta)"""
+    all_metrics = []
+
+    for json_file in files:
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                all_metrics.extend(json.load(f))
+        except Exception as e:
+            logger.warning("[DATA LOADER] Error loading %s: %s", json_file, e)
+
+    if not all_metrics:
+        return pd.DataFrame()
+
+    return pd.DataFrame(all_metrics)
+
+
+def _write_cache(df: pd.DataFrame):
+    """Uloží DataFrame do parquet cache (dict hodnoty ako JSON stĺpec)"""
+    if df.empty:
+        return
+
+    try:
+        out = df.copy()
+        if 'value' in out.columns:
+            # Parquet nevie mixovať float a dict (blood_pressure) - rozdeliť na 2 stĺpce
+            values = out['value']
+            out['value'] = values.map(lambda v: v if not isinstance(v, dict) else None)
+            out['value_json'] = values.map(lambda v: json.dumps(v) if isinstance(v, dict) else None)
+        out.to_parquet(PARQUET_CACHE_PATH, compression='zstd')
+    except Exception as e:
+        logger.warning("[DATA LOADER] Cannot write parquet cache: %s", e)
+
+
+def _decode_cache(df: pd.DataFrame) -> pd.DataFrame:
+    """Obnoví dict hodnoty (blood_pressure) z JSON stĺpca"""
+    if 'value_json' in df.columns:
+        value_json = df.pop('value_json')
+        mask = value_json.notna()
+        if mask.any():
+            values = df['value'].astype(object)
+            values[mask] = [json.loads(s) for s in value_json[mask]]
+            df['value'] = values
+    return df
+
+
+def load_extracted_dataframe() -> pd.DataFrame:
+    """
+    Načíta všetky extrahované metriky ako DataFrame
+
+    Parsovanie stoviek JSON blobov je drahé - ak je parquet cache novšia než
+    najnovší JSON export, číta sa priamo columnar formát.
+    """
+    files = _json_files()
+    if not files:
+        return pd.DataFrame()
+
+    latest_mtime = max(f.stat().st_mtime for f in files)
+
+    if PARQUET_CACHE_PATH.exists() and PARQUET_CACHE_PATH.stat().st_mtime >= latest_mtime:
+        try:
+            return _decode_cache(pd.read_parquet(PARQUET_CACHE_PATH))
+        except Exception as e:
+            logger.warning("[DATA LOADER] Parquet cache read failed, falling back to JSON: %s", e)
+
+    df = _load_json_files(files)
+    _write_cache(df)
+    return df
+
+
+def load_combined_dataframe() -> pd.DataFrame:
+    """Načíta všetky zdravotné dáta (OCR + Manuálne + Apple Health) do jedného DataFrame"""
+    frames = []
+
+    # 1. Načítať OCR extrahované dáta zo súborov (cez parquet cache)
+    df_json = load_extracted_dataframe()
+    if not df_json.empty:
+        # Normalizovať názvy metrík (pulse → heart_rate)
+        df_json.loc[df_json['metric'] == 'pulse', 'metric'] = 'heart_rate'
+        if 'date' in df_json.columns:
+            # Známy formát extrahovaných dátumov - rýchla typovaná cesta
+            df_json['date'] = pd.to_datetime(
+                df_json['date'], format='%Y-%m-%d', errors='coerce', cache=True
+            )
+        frames.append(df_json)
+
+    # Jedna session pre oba DB zdroje - netreba platiť pripojenie dvakrát
+    try:
+        session = get_session()
+    except Exception as e:
+        session = None
+        logger.warning("[DATA LOADER] Error opening DB session: %s", e)
+
+    # 2. Načítať manuálne zadané záznamy z databázy priamo do DataFrame
+    try:
+        if session is not None:
+            manual_sql = (
+                "SELECT record_date AS date, metric_type AS metric, "
+                "value, unit, notes "
+                "FROM health_records WHERE source = 'manual'"
+            )
+            df_manual = pd.read_sql_query(
+                manual_sql, session.get_bind(), parse_dates=['date']
+            )
+
+            logger.debug("[DATA LOADER] Found %d manual records", len(df_manual))
+
+            if not df_manual.empty:
+                # Normalizovať názvy metrík (pulse → heart_rate)
+                df_manual.loc[df_manual['metric'] == 'pulse', 'metric'] = 'heart_rate'
+                df_manual['value'] = df_manual['value'].map(_to_float)
+                df_manual['source'] = 'manual'
+                frames.append(df_manual)
+    except Exception as e:
+        logger.exception("[DATA LOADER] Error loading manual records: %s", e)
+
+    # 3. Načítať Apple Health dáta z databázy - remap typu na metriku rieši
+    # SQL CASE, pandas dostane hotové columnar stĺpce bez Python loopu
+    try:
+        if session is not None:
+            logger.debug("[DATA LOADER] Loading Apple Health records...")
+
+            case_branches = " ".join(
+                f"WHEN '{apple_type}' THEN '{metric}'"
+                for apple_type, metric in APPLE_TO_METRIC_MAP.items()
+            )
+            # Načítať len relevantné typy (nie všetky 643k záznamov)
+            type_list = ", ".join(f"'{t}'" for t in APPLE_TO_METRIC_MAP)
+            apple_sql = (
+                "SELECT start_date AS date, "
+                f"CASE record_type {case_branches} END AS metric, "
+                "CAST(value AS REAL) AS value, unit, device_name AS device "
+                f"FROM apple_health_data WHERE record_type IN ({type_list}) "
+                "AND value IS NOT NULL"
+            )
+            df_apple = pd.read_sql_query(
+                apple_sql, session.get_bind(), parse_dates=['date']
+            )
+
+            logger.debug("[DATA LOADER] Found %d Apple Health records (filtered by type)", len(df_apple))
+
+            if not df_apple.empty:
+                df_apple['source'] = 'apple_health'
+                frames.append(df_apple)
+    except Exception as e:
+        logger.exception("[DATA LOADER] Error loading Apple Health records: %s", e)
+
+    if session is not None:
+        session.close()
+
+    if not frames:
+        return pd.DataFrame()
+
+    # Spojiť všetky zdroje do jedného DataFrame
+    df = pd.concat(frames, ignore_index=True)
+
+    # Dátumy sú už typované per zdroj (JSON s formátom, DB cez parse_dates);
+    # globálny to_datetime fallback zostáva len pre zmiešané dtype po concate
+    if 'date' in df.columns and df['date'].dtype != 'datetime64[ns]':
+        df['date'] = pd.to_datetime(df['date'], errors='coerce')
+
+    # Konvertovať hodnotu na číslo, dict hodnoty (blood_pressure) zachovať
+    if 'value' in df.columns:
+        numeric = pd.to_numeric(df['value'], errors='coerce')
+        is_dict = df['value'].map(lambda v: isinstance(v, dict))
+        if is_dict.any():
+            df['value'] = numeric.astype(object).where(~is_dict, df['value'])
+        else:
+            df['value'] = numeric
+
+    # Odstrániť riadky bez dátumu alebo hodnoty
+    rows_before = len(df)
+    df = df.dropna(subset=['date', 'value'])
+    logger.debug("[DATA LOADER] Dropped %d rows with NaN date/value", rows_before - len(df))
+
+    # Zoradiť podľa dátumu - analyzery sa na poradie spoliehajú (searchsorted rezy)
+    df = df.sort_values('date').reset_index(drop=True)
+
+    # Kategorické dtypes: ~10 unikátnych hodnôt opakovaných cez státisíce riadkov,
+    # int kódy namiesto string pointerov šetria pamäť a zrýchľujú groupby/==
+    for col in ('metric', 'source', 'unit'):
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    logger.info("[DATA LOADER] Loaded %d total metrics from all sources", len(df))
+
+    return df
+
+
+class DataLoader:
+    """Zdieľaná cache kompletného DataFrame pre TrendAnalyzer aj HealthMetricsAnalyzer"""
+
+    _lock = threading.Lock()
+    _cache = None
+    _cache_state = None
+    _last_idx = None
+
+    # Debounce sondy: analyzer v jednom requeste volá get_dataframe() aj
+    # get_last_indices(), sonda sa ale spustí len raz za TTL okno
+    _STATE_PROBE_TTL = 1.0  # sekundy
+    _state = None
+    _state_probed_at = 0.0
+
+    @classmethod
+    def _source_state(cls) -> tuple:
+        """Fingerprint všetkých zdrojov cache
+
+        JSON súbory pokrýva max mtime; DB zdroje lacná sonda cez indexované
+        stĺpce - health_records count + max(updated_at) (malá tabuľka),
+        apple_health_data max(id) (PK index, žiadny scan 643k riadkov).
+        Zápis čisto do DB tak invaliduje cache rovnako ako nový súbor.
+        """
+        now = time.monotonic()
+        if cls._state is not None and now - cls._state_probed_at < cls._STATE_PROBE_TTL:
+            return cls._state
+
+        mtimes = [p.stat().st_mtime for p in _json_files()]
+        json_mtime = max(mtimes, default=0.0)
+
+        db_state = None
+        try:
+            session = get_session()
+            try:
+                db_state = tuple(session.execute(text(
+                    "SELECT (SELECT COUNT(*) FROM health_records), "
+                    "(SELECT MAX(updated_at) FROM health_records), "
+                    "(SELECT MAX(id) FROM apple_health_data)"
+                )).first())
+            finally:
+                session.close()
+        except Exception as e:
+            logger.warning("[DATA LOADER] DB freshness probe failed: %s", e)
+
+        cls._state = (json_mtime, db_state)
+        cls._state_probed_at = now
+        return cls._state
+
+    @classmethod
+    def get_dataframe(cls) -> pd.DataFrame:
+        """Vráti cachovaný DataFrame, reload len pri zmene zdrojových dát"""
+        latest_state = cls._source_state()
+
+        # Lock: FastAPI obsluhuje requesty paralelne, bez neho by súbežné
+        # requesty spustili N plných reloadov naraz
+        with cls._lock:
+            if cls._cache is not None and cls._cache_state == latest_state:
+                logger.debug("[DATA LOADER] Using cached data (%d rows)", len(cls._cache))
+                return cls._cache
+
+            cls._cache = load_combined_dataframe()
+            cls._cache_state = latest_state
+            cls._last_idx = None
+            logger.info("[DATA LOADER] Loaded fresh data (%d rows), cached until sources change",
+                        len(cls._cache))
+            return cls._cache
+
+    @classmethod
+    def get_last_indices(cls) -> dict:
+        """Index posledného riadku každej metriky - dáta sú zoradené podľa dátumu,
+        takže najnovšia hodnota je priamy lookup bez sortu a skenu"""
+        df = cls.get_dataframe()
+
+        with cls._lock:
+            if cls._last_idx is None:
+                if df.empty or 'metric' not in df.columns:
+                    cls._last_idx = {}
+                else:
+                    cls._last_idx = {
+                        m: g.index[-1]
+                        for m, g in df.groupby('metric', sort=False, observed=True)
+                    }
+            return cls._last_idx
+
+    @classmethod
+    def invalidate(cls):
+        """Vymaže cache - ďalší request načíta dáta znova"""
+        with cls._lock:
+            cls._cache = None
+            cls._cache_state = None
+            cls._last_idx = None
+            cls._state = None
+            cls._state_probed_at = 0.0
@@ -1,78 +1,91 @@
 import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Optional
 from pathlib import Path
 import json
 
 from app.config import settings
+from app.analysis.data_loader import DataLoader
+
+
+# Prahové hodnoty pre skalárne metriky - jedna tabuľka namiesto dict lookupov per volanie
+THRESHOLDS = pd.DataFrame({
+    'metric': ['glucose', 'hba1c', 'cholesterol', 'ldl', 'triglycerides', 'bmi'],
+    'warn': [5.6, 5.7, 5.2, 3.0, 1.7, 25.0],
+    'alert': [7.0, 6.5, 6.2, 4.0, 2.3, 30.0],
+}).set_index('metric')
 
 class HealthMetricsAnalyzer:
     """Analyzuje aktuálne zdravotné metriky"""
-    
+
     def __init__(self):
         self.data = self._load_all_data()
-    
+        # Predpočítaný index posledného riadku per metrika (cachovaný v DataLoader)
+        self._last_idx = DataLoader.get_last_indices()
+
     def _load_all_data(self) -> pd.DataFrame:
-        """Načíta všetky extrahované dáta"""
-        all_metrics = []
-        
-        for json_file in settings.PROCESSED_DATA_DIR.glob("extracted_data_*.json"):
-            with open(json_file, 'r', encoding='utf-8') as f:
-                metrics = json.load(f)
-                all_metrics.extend(metrics)
-        
-        if not all_metrics:
-            return pd.DataFrame()
-        
-        df = pd.DataFrame(all_metrics)
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-        
-        return df
+        """Získa dáta zo zdieľaného DataLoader (dátumy už sú typované)"""
+        return DataLoader.get_dataframe()
     
     def get_latest_metrics(self) -> Dict:
         """Získa najnovšie hodnoty všetkých metrík"""
-        if self.data.empty:
+        if self.data.empty or not self._last_idx:
             return {"error": "No data available"}
-        
+
+        # Posledný riadok každej metriky je predpočítaný - O(počet metrík)
+        # indexovaný prístup namiesto sortu a skenu celého datasetu
+        latest_df = self.data.loc[list(self._last_idx.values())]
+
+        # Statusy pre skalárne metriky vyhodnotiť vektorizovane v jednom prechode
+        joined = latest_df.merge(THRESHOLDS, left_on='metric', right_index=True, how='left')
+        scalar_values = joined['value'].map(
+            lambda v: v if isinstance(v, (int, float)) else np.nan
+        ).astype(float)
+        statuses = np.where(
+            scalar_values >= joined['alert'], 'alert',
+            np.where(scalar_values >= joined['warn'], 'warning', 'normal')
+        )
+
+        # Dátumy naformátovať hromadne jedným C-loopom namiesto strftime per riadok
+        date_strs = joined['date'].dt.strftime('%Y-%m-%d').to_numpy()
+
         latest_metrics = {}
-        
-        for metric_name in self.data['metric'].unique():
-            metric_data = self.data[self.data['metric'] == metric_name]
-            metric_data = metric_data.dropna(subset=['date'])
-            
-            if not metric_data.empty:
-                latest_row = metric_data.sort_values('date').iloc[-1]
-                latest_metrics[metric_name] = {
-                    'value': latest_row['value'],
-                    'date': latest_row['date'].strftime('%Y-%m-%d') if pd.notna(latest_row['date']) else None,
-                    'status': self._get_metric_status(metric_name, latest_row['value'])
-                }
-        
+
+        for row, status, date_str in zip(joined.itertuples(index=False), statuses, date_strs):
+            if isinstance(row.value, dict) or row.value is None:
+                # Krvný tlak (dict) a chýbajúce hodnoty idú cez pôvodnú vetvu
+                status = self._get_metric_status(row.metric, row.value)
+            latest_metrics[row.metric] = {
+                'value': row.value,
+                'date': date_str,
+                'status': status
+            }
+
         return latest_metrics
-    
+
     def get_metrics_history(self, days: int = 365) -> Dict:
         """Získa históriu meraní za posledných N dní"""
         if self.data.empty:
             return {"error": "No data available"}
-        
+
         cutoff_date = datetime.now() - timedelta(days=days)
-        recent_data = self.data[self.data['date'] >= cutoff_date]
-        
+
+        # Dáta sú zoradené podľa dátumu - binárne hľadanie rezu namiesto
+        # O(N) boolean masky cez celý dataset
+        idx = self.data['date'].searchsorted(np.datetime64(cutoff_date))
+        recent_data = self.data.iloc[idx:]
+
         history = {}
-        
-        for metric_name in recent_data['metric'].unique():
-            metric_data = recent_data[recent_data['metric'] == metric_name]
-            metric_data = metric_data.sort_values('date')
-            
+
+        # Dáta už sú zoradené, stačí groupby bez ďalšieho sortu
+        for metric_name, group in recent_data.groupby('metric', sort=False, observed=True):
+            date_strs = group['date'].dt.strftime('%Y-%m-%d').to_numpy()
             history[metric_name] = [
-                {
-                    'date': row['date'].strftime('%Y-%m-%d') if pd.notna(row['date']) else None,
-                    'value': row['value']
-                }
-                for _, row in metric_data.iterrows()
+                {'date': d, 'value': v}
+                for d, v in zip(date_strs, group['value'].to_numpy())
             ]
-        
+
         return history
     
     def get_comprehensive_summary(self) -> Dict:
@@ -108,24 +121,16 @@ class HealthMetricsAnalyzer:
             else:
                 return "normal"
         
-        # Pre ostatné metriky
-        thresholds = {
-            'glucose': {'warning': 5.6, 'alert': 7.0},
-            'hba1c': {'warning': 5.7, 'alert': 6.5},
-            'cholesterol': {'warning': 5.2, 'alert': 6.2},
-            'ldl': {'warning': 3.0, 'alert': 4.0},
-            'triglycerides': {'warning': 1.7, 'alert': 2.3},
-            'bmi': {'warning': 25, 'alert': 30}
-        }
-        
-        if metric_name in thresholds:
-            if value >= thresholds[metric_name]['alert']:
+        # Pre ostatné metriky - rovnaké prahy ako vektorizovaná cesta
+        if metric_name in THRESHOLDS.index:
+            limits = THRESHOLDS.loc[metric_name]
+            if value >= limits['alert']:
                 return "alert"
-            elif value >= thresholds[metric_name]['warning']:
+            elif value >= limits['warn']:
                 return "warning"
             else:
                 return "normal"
-        
+
         return "normal"
     
     def _calculate_health_score(self, latest_metrics: Dict) -> int:
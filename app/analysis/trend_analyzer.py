@@ -2,170 +2,62 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from typing import Optional, Dict, List
-from pathlib import Path
-import json
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
 
-from app.config import settings
-from app.database import get_session, HealthRecord, AppleHealthData
+from app.analysis.data_loader import DataLoader
 
+logger = logging.getLogger(__name__)
+
+# Numba JIT pre tesné numerické slučky (voliteľné) - bez numby beží čistý NumPy
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+
+        def wrap(func):
+            return func
+        return wrap
+
+
+@njit(cache=True)
+def trend_slope(values: np.ndarray) -> float:
+    """Sklon lineárnej regresie (uzavretý vzorec) nad float64 poľom"""
+    n = values.size
+    mean = values.mean()
+    half = (n - 1) / 2.0
+    num = 0.0
+    den = 0.0
+    for i in range(n):
+        dx = i - half
+        num += dx * (values[i] - mean)
+        den += dx * dx
+    return num / den
+
+
+@njit(cache=True)
+def classify_slope(slope: float) -> int:
+    """0 = decreasing, 1 = stable, 2 = increasing"""
+    if slope > 0.1:
+        return 2
+    elif slope < -0.1:
+        return 0
+    return 1
 
-def _to_float(value):
-    """Convert value to float, handling comma decimal and non-numeric gracefully."""
-    if value is None:
-        return None
-    try:
-        return float(str(value).replace(',', '.'))
-    except Exception:
-        return None
 
 class TrendAnalyzer:
     """Analyzuje trendy v zdravotných ukazovateľoch"""
-    
-    # Class-level cache pre dáta (zdieľaný medzi inštanciami)
-    _data_cache = None
-    _cache_timestamp = None
-    _cache_ttl = 300  # 5 minút cache
-    
+
     def __init__(self):
-        # Použiť cache ak je aktuálny
-        if (TrendAnalyzer._data_cache is not None and 
-            TrendAnalyzer._cache_timestamp and
-            (datetime.now() - TrendAnalyzer._cache_timestamp).total_seconds() < TrendAnalyzer._cache_ttl):
-            self.data = TrendAnalyzer._data_cache
-            print(f"[TREND] Using cached data ({len(self.data)} rows)")
-        else:
-            self.data = self._load_data()
-            TrendAnalyzer._data_cache = self.data
-            TrendAnalyzer._cache_timestamp = datetime.now()
-            print(f"[TREND] Loaded fresh data ({len(self.data)} rows), cached for {TrendAnalyzer._cache_ttl}s")
-    
-    def _load_data(self) -> pd.DataFrame:
-        """Načíta všetky zdravotné dáta (OCR + Manuálne + Apple Health)"""
-        all_metrics = []
-        
-        # 1. Načítať OCR extrahované dáta zo súborov
-        for json_file in settings.PROCESSED_DATA_DIR.glob("extracted_data_*.json"):
-            try:
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    metrics = json.load(f)
-                    # Normalizovať názvy metrík (pulse → heart_rate)
-                    for metric in metrics:
-                        if metric.get('metric') == 'pulse':
-                            metric['metric'] = 'heart_rate'
-                    all_metrics.extend(metrics)
-            except Exception as e:
-                print(f"[TREND] Error loading {json_file}: {e}")
-        
-        # 2. Načítať manuálne zadané záznamy z databázy
-        try:
-            session = get_session()
-            manual_records = session.query(HealthRecord).filter_by(source="manual").all()
-            
-            print(f"[TREND] Found {len(manual_records)} manual records")
-            
-            for record in manual_records:
-                # Normalizovať názvy metrík (pulse → heart_rate)
-                metric_type = record.metric_type
-                if metric_type == 'pulse':
-                    metric_type = 'heart_rate'
-                    
-                metric_data = {
-                    'date': record.record_date,  # Nechať ako date objekt, nie .isoformat()
-                    'metric': metric_type,
-                    'value': _to_float(record.value),
-                    'unit': record.unit,
-                    'source': 'manual',
-                    'notes': record.notes
-                }
-                print(f"[TREND] Manual: {metric_type} = {record.value} {record.unit} on {record.record_date}")
-                all_metrics.append(metric_data)
-            
-            session.close()
-        except Exception as e:
-            print(f"[TREND] Error loading manual records: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        # 3. Načítať Apple Health dáta z databázy
-        try:
-            session = get_session()
-            
-            print("[TREND] Loading Apple Health records...")
-            
-            # Mapovanie Apple Health typov na naše metriky
-            apple_to_metric_map = {
-                'HKQuantityTypeIdentifierBodyMass': 'weight',
-                'HKQuantityTypeIdentifierHeight': 'height',
-                'HKQuantityTypeIdentifierHeartRate': 'heart_rate',
-                'HKQuantityTypeIdentifierBloodPressureSystolic': 'blood_pressure_systolic',
-                'HKQuantityTypeIdentifierBloodPressureDiastolic': 'blood_pressure_diastolic',
-                'HKQuantityTypeIdentifierBodyMassIndex': 'bmi',
-                'HKQuantityTypeIdentifierBloodGlucose': 'glucose',
-            }
-            
-            # Načítať len relevantné typy (nie všetky 643k záznamov)
-            relevant_types = list(apple_to_metric_map.keys())
-            apple_records = session.query(AppleHealthData).filter(
-                AppleHealthData.record_type.in_(relevant_types)
-            ).all()
-            
-            print(f"[TREND] Found {len(apple_records)} Apple Health records (filtered by type)")
-            
-            for record in apple_records:
-                metric_name = apple_to_metric_map.get(record.record_type)
-                if metric_name and record.value is not None:
-                    all_metrics.append({
-                        'date': record.start_date,  # Nechať ako datetime objekt, nie .isoformat()
-                        'metric': metric_name,
-                        'value': float(record.value),
-                        'unit': record.unit,
-                        'source': 'apple_health',
-                        'device': record.device_name
-                    })
-            
-            print(f"[TREND] Converted {len([m for m in all_metrics if m.get('source') == 'apple_health'])} Apple Health records to metrics")
-            
-            session.close()
-        except Exception as e:
-            print(f"[TREND] Error loading Apple Health records: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        if not all_metrics:
-            return pd.DataFrame()
-        
-        print(f"[TREND] Total metrics before DataFrame: {len(all_metrics)}")
-        
-        # Konvertovať na DataFrame
-        df = pd.DataFrame(all_metrics)
-        
-        print(f"[TREND] DataFrame shape before conversion: {df.shape}")
-        print(f"[TREND] DataFrame columns: {df.columns.tolist()}")
-        print(f"[TREND] Sample data:\n{df.head(3)}")
-        
-        # Konvertovať dátum
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
-            print(f"[TREND] Rows after date conversion: {len(df)}, NaN dates: {df['date'].isna().sum()}")
-        
-        # Konvertovať hodnotu na číslo
-        if 'value' in df.columns:
-            df['value'] = pd.to_numeric(df['value'], errors='coerce')
-            print(f"[TREND] Rows after value conversion: {len(df)}, NaN values: {df['value'].isna().sum()}")
-        
-        # Odstrániť riadky bez dátumu alebo hodnoty
-        rows_before = len(df)
-        df = df.dropna(subset=['date', 'value'])
-        rows_after = len(df)
-        print(f"[TREND] Dropped {rows_before - rows_after} rows with NaN date/value")
-        
-        # Zoradiť podľa dátumu
-        df = df.sort_values('date')
-        
-        print(f"[TREND] Loaded {len(df)} total metrics from all sources")
-        
-        return df
-    
+        # Dáta drží zdieľaný DataLoader - inštancia je lacná a vzniká per request
+        self.data = DataLoader.get_dataframe()
+
     def analyze_trends(
         self,
         metric: Optional[str] = None,
@@ -180,28 +72,31 @@ class TrendAnalyzer:
             start_date: Začiatočný dátum (YYYY-MM-DD)
             end_date: Konečný dátum (YYYY-MM-DD)
         """
-        print(f"[TREND] analyze_trends called: metric={metric}, start={start_date}, end={end_date}")
-        print(f"[TREND] Data shape: {self.data.shape if not self.data.empty else 'EMPTY'}")
+        logger.debug("[TREND] analyze_trends called: metric=%s, start=%s, end=%s",
+                     metric, start_date, end_date)
         
         if self.data.empty:
-            print("[TREND] WARNING: No data available!")
+            logger.warning("[TREND] No data available!")
             return {"trends": {}, "message": "Zatiaľ nie sú k dispozícii žiadne dáta. Pridajte zdravotné záznamy manuálne alebo nahrajte dokumenty."}
         
-        df = self.data.copy()
-        
-        # Filtrovať podľa dátumu (len ak máme validné dátumy)
-        if 'date' in df.columns:
+        df = self.data
+
+        # Dáta sú zoradené podľa dátumu - dátumový filter je searchsorted rez
+        # (binárne hľadanie) namiesto boolean masky cez celý dataset
+        if 'date' in df.columns and (start_date or end_date):
+            lo, hi = 0, len(df)
             if start_date:
                 try:
-                    df = df[df['date'] >= pd.to_datetime(start_date)]
-                except:
+                    lo = df['date'].searchsorted(np.datetime64(start_date), side='left')
+                except ValueError:
                     pass
             if end_date:
                 try:
-                    df = df[df['date'] <= pd.to_datetime(end_date)]
-                except:
+                    hi = df['date'].searchsorted(np.datetime64(end_date), side='right')
+                except ValueError:
                     pass
-        
+            df = df.iloc[lo:hi]
+
         # Filtrovať podľa metriky
         if metric:
             df = df[df['metric'] == metric]
@@ -209,18 +104,22 @@ class TrendAnalyzer:
         if df.empty:
             return {"error": "No data found", "message": "Žiadne dáta pre zvolené filtre"}
         
+        # Metriky sú nezávislé a NumPy redukcie púšťajú GIL - analyzovať paralelne
+        groups = list(df.groupby('metric', sort=False, observed=True))
         trends = {}
-        
-        # Analyzovať každú metriku
-        for metric_name in df['metric'].unique():
-            try:
-                metric_data = df[df['metric'] == metric_name]
-                trend = self._analyze_single_metric(metric_name, metric_data)
-                trends[metric_name] = trend
-            except Exception as e:
-                print(f"[TREND ERROR] Cannot analyze {metric_name}: {e}")
-                trends[metric_name] = {"error": str(e)}
-        
+
+        with ThreadPoolExecutor(max_workers=min(len(groups), os.cpu_count() or 1)) as executor:
+            futures = {
+                metric_name: executor.submit(self._analyze_single_metric, metric_name, group)
+                for metric_name, group in groups
+            }
+            for metric_name, future in futures.items():
+                try:
+                    trends[metric_name] = future.result()
+                except Exception as e:
+                    logger.warning("[TREND ERROR] Cannot analyze %s: %s", metric_name, e)
+                    trends[metric_name] = {"error": str(e)}
+
         return trends
     
     def _analyze_single_metric(self, metric_name: str, data: pd.DataFrame) -> Dict:
@@ -233,28 +132,20 @@ class TrendAnalyzer:
             if metric_name == 'blood_pressure':
                 return self._analyze_blood_pressure(data)
             
-            # Štandardná analýza
-            values = data['value'].dropna()
-            
-            if len(values) == 0:
-                return {"error": "No valid values"}
-            
-            # Konvertovať na float
-            numeric_values = []
-            for val in values:
-                if isinstance(val, (int, float)):
-                    numeric_values.append(float(val))
-            
-            if len(numeric_values) == 0:
+            # Štandardná analýza - jedno contiguous float64 pole namiesto Python listu,
+            # všetky redukcie bežia nad rovnakým bufferom bez opakovanej konverzie
+            arr = pd.to_numeric(data['value'], errors='coerce').dropna().to_numpy(dtype=np.float64)
+
+            if arr.size == 0:
                 return {"error": "No numeric values"}
-            
+
             trend_data = {
-                'count': len(numeric_values),
-                'latest': float(numeric_values[-1]) if len(numeric_values) > 0 else None,
-                'mean': float(np.mean(numeric_values)),
-                'min': float(np.min(numeric_values)),
-                'max': float(np.max(numeric_values)),
-                'std': float(np.std(numeric_values)) if len(numeric_values) > 1 else 0,
+                'count': int(arr.size),
+                'latest': float(arr[-1]),
+                'mean': float(arr.mean()),
+                'min': float(arr.min()),
+                'max': float(arr.max()),
+                'std': float(arr.std()) if arr.size > 1 else 0,
                 'trend': self._calculate_trend(data),
                 'values_over_time': self._get_values_over_time(data)
             }
@@ -265,20 +156,15 @@ class TrendAnalyzer:
             return trend_data
             
         except Exception as e:
-            print(f"[TREND ERROR] Cannot analyze {metric_name}: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[TREND ERROR] Cannot analyze %s: %s", metric_name, e)
             return {"error": str(e)}
     
     def _analyze_blood_pressure(self, data: pd.DataFrame) -> Dict:
         """Špeciálna analýza pre krvný tlak"""
-        systolic_values = []
-        diastolic_values = []
-        
-        for _, row in data.iterrows():
-            if isinstance(row['value'], dict):
-                systolic_values.append(row['value'].get('systolic'))
-                diastolic_values.append(row['value'].get('diastolic'))
+        # Jedna list comprehension nad numpy poľom namiesto iterrows (žiadne Series per riadok)
+        values = data['value'].to_numpy()
+        systolic_values = [v.get('systolic') for v in values if isinstance(v, dict)]
+        diastolic_values = [v.get('diastolic') for v in values if isinstance(v, dict)]
         
         return {
             'systolic': {
@@ -312,36 +198,24 @@ class TrendAnalyzer:
         
         # Lineárna regresia
         data_sorted = data_with_dates.sort_values('date')
-        
-        # Konvertovať hodnoty na float, ignorovať dict (blood_pressure)
-        values = []
-        for val in data_sorted['value'].values:
-            if isinstance(val, (int, float)):
-                values.append(float(val))
-            elif isinstance(val, dict):
-                # Pre blood pressure použiť systolic
-                if 'systolic' in val:
-                    values.append(float(val['systolic']))
-        
-        if len(values) < 2:
+
+        # Pre blood pressure (dict hodnoty) počítať trend zo systolického tlaku,
+        # inak hodnoty už sú numerické - jedno contiguous float64 pole pre JIT
+        values = data_sorted['value']
+        if values.map(lambda v: isinstance(v, dict)).any():
+            arr = np.asarray([
+                float(v['systolic']) for v in values
+                if isinstance(v, dict) and 'systolic' in v
+            ], dtype=np.float64)
+        else:
+            arr = pd.to_numeric(values, errors='coerce').dropna().to_numpy(dtype=np.float64)
+
+        if arr.size < 2:
             return "insufficient_data"
-        
-        # Konvertovať na numpy array s explicitným float64
-        values_array = np.array(values, dtype=np.float64)
-        x = np.arange(len(values_array), dtype=np.float64)
-        
-        try:
-            slope = np.polyfit(x, values_array, 1)[0]
-            
-            if slope > 0.1:
-                return "increasing"
-            elif slope < -0.1:
-                return "decreasing"
-            else:
-                return "stable"
-        except Exception as e:
-            print(f"[TREND ERROR] Cannot calculate trend: {e}")
-            return "unknown"
+
+        # JIT-kompilovaná slučka (pozri trend_slope) - pre >100k Apple Health
+        # riadkov beží LLVM kód bez GIL namiesto pandas/Python medzikrokov
+        return ('decreasing', 'stable', 'increasing')[classify_slope(trend_slope(arr))]
     
     def _get_values_over_time(self, data: pd.DataFrame) -> List[Dict]:
         """Získa hodnoty v čase pre grafické zobrazenie"""
@@ -355,28 +229,29 @@ class TrendAnalyzer:
             return []
         
         data_sorted = data_with_dates.sort_values('date')
+
+        # Dátumy naformátovať hromadne, hodnoty iterovať ako numpy pole (bez iterrows)
+        dates = data_sorted['date'].dt.strftime('%Y-%m-%d').to_numpy()
+        vals = data_sorted['value'].to_numpy()
+
         values_list = []
-        
-        for _, row in data_sorted.iterrows():
-            val = row['value']
-            
+        for date_str, val in zip(dates, vals):
             # Konvertovať dict (blood_pressure) na číslo
             if isinstance(val, dict):
                 val = val.get('systolic', None)
-            
+
+            if val is None:
+                continue
+
             try:
-                date_str = row['date'].strftime('%Y-%m-%d') if pd.notna(row['date']) else None
-                value_float = float(val) if val is not None and not isinstance(val, dict) else None
-                
-                if date_str and value_float is not None:
-                    values_list.append({
-                        'date': date_str,
-                        'value': value_float
-                    })
-            except Exception as e:
-                print(f"[TREND ERROR] Cannot process value: {e}")
+                values_list.append({
+                    'date': date_str,
+                    'value': float(val)
+                })
+            except (TypeError, ValueError) as e:
+                logger.debug("[TREND ERROR] Cannot process value: %s", e)
                 continue
-        
+
         return values_list
     
     def _interpret_metric(self, metric_name: str, trend_data: Dict) -> str:
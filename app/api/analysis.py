@@ -1,19 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from typing import Optional
 from datetime import datetime, timedelta
 
+from app.analysis.data_loader import DataLoader
 from app.analysis.trend_analyzer import TrendAnalyzer
 from app.analysis.health_metrics import HealthMetricsAnalyzer
 
 router = APIRouter()
-trend_analyzer = TrendAnalyzer()
-metrics_analyzer = HealthMetricsAnalyzer()
+
+
+def get_trend_analyzer() -> TrendAnalyzer:
+    """Per-request inštancia - dáta drží zdieľaný DataLoader, konštrukcia je lacná"""
+    return TrendAnalyzer()
+
+
+def get_metrics_analyzer() -> HealthMetricsAnalyzer:
+    """Per-request inštancia - dáta drží zdieľaný DataLoader, konštrukcia je lacná"""
+    return HealthMetricsAnalyzer()
+
 
 @router.get("/trends")
 async def get_health_trends(
     metric: Optional[str] = None,
     start_date: Optional[str] = None,
-    end_date: Optional[str] = None
+    end_date: Optional[str] = None,
+    trend_analyzer: TrendAnalyzer = Depends(get_trend_analyzer)
 ):
     """
     Analyzuje trendy v zdravotných ukazovateľoch
@@ -56,7 +67,9 @@ async def get_health_trends(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/metrics/latest")
-async def get_latest_metrics():
+async def get_latest_metrics(
+    metrics_analyzer: HealthMetricsAnalyzer = Depends(get_metrics_analyzer)
+):
     """Získa najnovšie zdravotné ukazovatele"""
     try:
         latest = metrics_analyzer.get_latest_metrics()
@@ -66,7 +79,10 @@ async def get_latest_metrics():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/metrics/history")
-async def get_metrics_history(days: int = 365):
+async def get_metrics_history(
+    days: int = 365,
+    metrics_analyzer: HealthMetricsAnalyzer = Depends(get_metrics_analyzer)
+):
     """Získa históriu meraní za posledných N dní"""
     try:
         history = metrics_analyzer.get_metrics_history(days=days)
@@ -79,7 +95,9 @@ async def get_metrics_history(days: int = 365):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/summary")
-async def get_health_summary():
+async def get_health_summary(
+    metrics_analyzer: HealthMetricsAnalyzer = Depends(get_metrics_analyzer)
+):
     """Komplexný zdravotný prehľad"""
     try:
         summary = metrics_analyzer.get_comprehensive_summary()
@@ -92,11 +110,9 @@ async def get_health_summary():
 async def refresh_trend_cache():
     """Vymaže cache a znova načíta všetky dáta"""
     try:
-        # Invalidovať cache
-        from app.analysis.trend_analyzer import TrendAnalyzer
-        TrendAnalyzer._data_cache = None
-        TrendAnalyzer._cache_timestamp = None
-        
+        # Invalidovať zdieľanú cache
+        DataLoader.invalidate()
+
         # Vytvoriť novú inštanciu aby sa dáta načítali znova
         new_analyzer = TrendAnalyzer()
         
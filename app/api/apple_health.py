@@ -3,15 +3,44 @@ Apple Health API - Import dát z iPhone Health appky
 Podporuje import z export.xml súboru
 """
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+# ORJSONResponse: orjson serializuje v Ruste (~5-10x rychlejsie nez stdlib
+# json) a datetime/date zvlada nativne bez .isoformat() rebrikov
+from fastapi.responses import ORJSONResponse
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from collections import Counter
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+import asyncio
+import queue
+import sys
+import time
+
+# lxml filtruje tagy a pristupuje k atribútom v C - na veľkých exportoch
+# výrazne rýchlejší parse; bez lxml beží stdlib ElementTree fallback
+try:
+    from lxml import etree as lxml_etree
+    LXML_AVAILABLE = True
+except ImportError:
+    lxml_etree = None
+    LXML_AVAILABLE = False
 from typing import List, Dict, Any
 import uuid
 from pathlib import Path
 
+import re
+
+import numpy as np
+from sqlalchemy import func
+
 from ..database.models import AppleHealthData, get_session
 
+# Device string má fixný formát - jeden prekompilovaný regex namiesto
+# piatich split reťazcov (~10 alokácií) na každý záznam
+_DEVICE_RE = re.compile(
+    r'name:([^,]*),\s*manufacturer:([^,]*),\s*model:([^,]*),'
+    r'\s*hardware:([^,]*),\s*software:([^>]*)'
+)
+
 router = APIRouter(prefix="/api/apple-health", tags=["apple_health"])
 
 
@@ -64,144 +93,184 @@ APPLE_HEALTH_TYPE_MAPPING = {
     "HKQuantityTypeIdentifierDietaryWater": "Pitie vody",
 }
 
+# Internované kľúče: record_type z parsera sa internuje tiež, takže dict
+# lookup končí na pointer-rovnosti namiesto porovnávania dlhých stringov
+APPLE_HEALTH_TYPE_MAPPING = {
+    sys.intern(k): v for k, v in APPLE_HEALTH_TYPE_MAPPING.items()
+}
+
 
 def parse_apple_health_date(date_str: str) -> datetime:
-    """Parse Apple Health datetime format"""
+    """Parse Apple Health datetime format
+
+    Formát je fixný "YYYY-MM-DD HH:MM:SS +ZZZZ" - priame rezanie stringu je
+    rádovo rýchlejšie než strptime (volá sa 3x na každý záznam). Timezone
+    časť sa ignoruje, nevalidný dátum vracia None aby ho caller preskočil.
+    """
+    if not date_str or len(date_str) < 19:
+        return None
     try:
-        # Formát: "2023-12-13 15:30:45 +0100"
-        # Odstránime timezone časť pre jednoduchosť
-        date_part = date_str.split('+')[0].split('-0')[0].strip()
-        return datetime.strptime(date_part, "%Y-%m-%d %H:%M:%S")
-    except Exception as e:
-        print(f"[APPLE HEALTH] Error parsing date '{date_str}': {e}")
-        return datetime.now()
+        return datetime(
+            int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+            int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19])
+        )
+    except ValueError:
+        print(f"[APPLE HEALTH] Error parsing date '{date_str}'")
+        return None
+
 
+def _new_parse_stats() -> Dict[str, Any]:
+    """Prázdna štruktúra štatistík parsovania"""
+    return {
+        "total_records": 0,
+        "by_type": {},
+        "date_range": {"start": None, "end": None}
+    }
 
-def parse_apple_health_xml(xml_content: bytes) -> Dict[str, Any]:
+
+def iter_apple_health_records(stream, stats: Dict[str, Any]):
     """
-    Parse Apple Health export.xml súbor (optimalizované - iteratívne parsovanie)
-    
-    Returns:
-        Dict s parsed dátami a štatistikami
+    Iteratívne parsovanie Apple Health export.xml - generátor record dictov
+
+    Yield-uje záznamy priebežne, takže konzument (DB import) môže bežať
+    súbežne s parsovaním a v pamäti nikdy nie je celý zoznam záznamov.
+    `stats` sa plní počas iterácie a je kompletný po jej skončení.
+
+    Args:
+        stream: file-like objekt s XML obsahom (napr. UploadFile.file)
+        stats: dict z _new_parse_stats(), plnený in-place
     """
+    from xml.etree.ElementTree import ParseError
+
+    print(f"[APPLE HEALTH] Using iterative XML parsing for better performance...")
+
+    # Iteratívne parsovanie - nezaťažuje pamäť!
+    # lxml s tag='Record' preskakuje nepodstatné elementy (MetadataEntry,
+    # HealthData, Workout...) už v C, stdlib ich filtruje až v Pythone
     try:
-        import io
-        from xml.etree.ElementTree import ParseError
-        
-        records = []
-        stats = {
-            "total_records": 0,
-            "by_type": {},
-            "date_range": {"start": None, "end": None}
-        }
-        
-        print(f"[APPLE HEALTH] Using iterative XML parsing for better performance...")
-        
-        # Iteratívne parsovanie - nezaťažuje pamäť!
-        # Použijeme iterparse namiesto fromstring
-        try:
-            context = ET.iterparse(io.BytesIO(xml_content), events=('end',))
-        except ParseError as e:
-            # Skúsme fallback na normálne parsovanie
-            print(f"[APPLE HEALTH] Warning: XML parse error at line {e.position[0]}, trying alternative approach...")
-            raise Exception(f"XML súbor má chybnú štruktúru na riadku {e.position[0]}. Skúste re-exportovať súbor z iPhone.")
-        
-        record_count = 0
-        
-        # Získať všetky <Record> elementy iteratívne
-        for event, elem in context:
-            if elem.tag != 'Record':
-                continue
-                
-            record = elem  # elem je už Record element
-            record_type = record.get('type', '')
-            value = record.get('value')
-            unit = record.get('unit', '')
-            start_date_str = record.get('startDate', '')
-            end_date_str = record.get('endDate', '')
-            creation_date_str = record.get('creationDate', '')
-            source_name = record.get('sourceName', '')
-            source_version = record.get('sourceVersion', '')
-            
-            # Device info (ak existuje)
-            device = record.get('device', '')
-            device_parts = {}
-            if device:
-                # Format: "<<HKDevice: ...>, name:iPhone, manufacturer:Apple, model:iPhone, hardware:iPhone14,2, software:16.6>"
-                if 'name:' in device:
-                    try:
-                        device_parts['name'] = device.split('name:')[1].split(',')[0].strip()
-                        device_parts['manufacturer'] = device.split('manufacturer:')[1].split(',')[0].strip()
-                        device_parts['model'] = device.split('model:')[1].split(',')[0].strip()
-                        device_parts['hardware'] = device.split('hardware:')[1].split(',')[0].strip()
-                        device_parts['software'] = device.split('software:')[1].split('>')[0].strip()
-                    except:
-                        pass
-            
-            # Konvertovať value na float (ak je to číslo)
+        root = None
+        if LXML_AVAILABLE:
+            context = lxml_etree.iterparse(stream, events=('end',), tag='Record')
+        else:
+            # Aj so start eventmi - koreň <HealthData> drží referencie na už
+            # spracované Record deti, bez ich orezávania rastie pamäť lineárne
+            context = ET.iterparse(stream, events=('start', 'end'))
             try:
-                value_float = float(value) if value else None
-            except:
-                value_float = None
-            
-            # Parse dates
-            start_date = parse_apple_health_date(start_date_str) if start_date_str else None
-            end_date = parse_apple_health_date(end_date_str) if end_date_str else None
-            creation_date = parse_apple_health_date(creation_date_str) if creation_date_str else None
-            
-            # Metadata
-            metadata = {}
-            for meta in record.findall('.//MetadataEntry'):
-                key = meta.get('key', '')
-                val = meta.get('value', '')
-                metadata[key] = val
-            
-            records.append({
-                "type": record_type,
-                "value": value_float,
-                "unit": unit,
-                "start_date": start_date,
-                "end_date": end_date,
-                "creation_date": creation_date,
-                "source_name": source_name,
-                "source_version": source_version,
-                "device": device_parts,
-                "metadata": metadata if metadata else None
-            })
-            
-            # Stats
-            stats["total_records"] += 1
-            
-            # Count by type
-            friendly_name = APPLE_HEALTH_TYPE_MAPPING.get(record_type, record_type)
-            if friendly_name not in stats["by_type"]:
-                stats["by_type"][friendly_name] = 0
-            stats["by_type"][friendly_name] += 1
-            
-            # Date range
-            if start_date:
-                if stats["date_range"]["start"] is None or start_date < stats["date_range"]["start"]:
-                    stats["date_range"]["start"] = start_date
-                if stats["date_range"]["end"] is None or start_date > stats["date_range"]["end"]:
-                    stats["date_range"]["end"] = start_date
-            
-            # Progress logging každých 5000 záznamov
-            record_count += 1
-            if record_count % 5000 == 0:
-                print(f"[APPLE HEALTH] Parsed {record_count:,} records...")
-            
-            # Uvoľniť pamäť - dôležité pre veľké súbory!
-            elem.clear()
-        
-        print(f"[APPLE HEALTH] Parsing complete: {len(records):,} records")
-        
-        return {
-            "records": records,
-            "stats": stats
+                _, root = next(context)
+            except StopIteration:
+                root = None
+    except ParseError as e:
+        # Skúsme fallback na normálne parsovanie
+        print(f"[APPLE HEALTH] Warning: XML parse error at line {e.position[0]}, trying alternative approach...")
+        raise Exception(f"XML súbor má chybnú štruktúru na riadku {e.position[0]}. Skúste re-exportovať súbor z iPhone.")
+
+    record_count = 0
+
+    # Lokálne väzby pre hot loop - globálne/atribútové lookupy vyriešiť
+    # raz pred slučkou, nie pri každom z miliónov záznamov
+    _mapping_get = APPLE_HEALTH_TYPE_MAPPING.get
+    _parse_date = parse_apple_health_date
+    _intern = sys.intern
+    by_type = Counter()
+    date_min = None
+    date_max = None
+
+    # Získať všetky <Record> elementy iteratívne
+    for event, elem in context:
+        if event == 'start' or elem.tag != 'Record':
+            continue
+
+        record = elem  # elem je už Record element
+        # Intern: ~20 unikátnych typov cez milióny záznamov zdieľa identitu
+        # s kľúčmi mapovania aj medzi sebou (menej pamäte, rýchlejší hash)
+        record_type = _intern(record.get('type', ''))
+        value = record.get('value')
+        unit = record.get('unit', '')
+        start_date_str = record.get('startDate', '')
+        end_date_str = record.get('endDate', '')
+        creation_date_str = record.get('creationDate', '')
+        source_name = record.get('sourceName', '')
+        source_version = record.get('sourceVersion', '')
+
+        # Device info (ak existuje)
+        # Format: "<<HKDevice: ...>, name:iPhone, manufacturer:Apple, model:iPhone, hardware:iPhone14,2, software:16.6>"
+        device = record.get('device', '')
+        device_parts = {}
+        if device:
+            m = _DEVICE_RE.search(device)
+            if m:
+                device_parts = {
+                    'name': m.group(1).strip(),
+                    'manufacturer': m.group(2).strip(),
+                    'model': m.group(3).strip(),
+                    'hardware': m.group(4).strip(),
+                    'software': m.group(5).strip(),
+                }
+
+        # Konvertovať value na float (ak je to číslo) - úzky except, holé
+        # `except:` platí exception mašinériu aj pri KeyboardInterrupt a spol.
+        try:
+            value_float = float(value) if value else None
+        except (ValueError, TypeError):
+            value_float = None
+
+        # Parse dates
+        start_date = _parse_date(start_date_str) if start_date_str else None
+        end_date = _parse_date(end_date_str) if end_date_str else None
+        creation_date = _parse_date(creation_date_str) if creation_date_str else None
+
+        # Metadata - MetadataEntry je vždy priame dieťa, iterácia detí
+        # namiesto XPath descendant hľadania per záznam
+        metadata = {
+            m.get('key', ''): m.get('value', '')
+            for m in record if m.tag == 'MetadataEntry'
         }
-        
-    except Exception as e:
-        raise Exception(f"Chyba pri parsovaní Apple Health XML: {str(e)}")
+
+        yield {
+            "type": record_type,
+            "value": value_float,
+            "unit": unit,
+            "start_date": start_date,
+            "end_date": end_date,
+            "creation_date": creation_date,
+            "source_name": source_name,
+            "source_version": source_version,
+            "device": device_parts,
+            "metadata": metadata if metadata else None
+        }
+
+        # Stats - Counter a lokálne min/max, do stats dictu až po slučke
+        by_type[_mapping_get(record_type, record_type)] += 1
+
+        # Date range
+        if start_date:
+            if date_min is None or start_date < date_min:
+                date_min = start_date
+            if date_max is None or start_date > date_max:
+                date_max = start_date
+
+        # Progress logging každých 5000 záznamov
+        record_count += 1
+        if record_count % 5000 == 0:
+            print(f"[APPLE HEALTH] Parsed {record_count:,} records...")
+
+        # Uvoľniť pamäť - dôležité pre veľké súbory!
+        elem.clear()
+        if LXML_AVAILABLE:
+            # Zmazať už spracovaných súrodencov, inak rastie zoznam detí roota
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        elif root is not None:
+            # stdlib ET: zahodiť spracované deti koreňa - elem.clear() samotný
+            # nechával referencie v roote a pamäť rástla s počtom záznamov
+            root.clear()
+
+    stats["total_records"] = record_count
+    stats["by_type"] = dict(by_type)
+    stats["date_range"]["start"] = date_min
+    stats["date_range"]["end"] = date_max
+
+    print(f"[APPLE HEALTH] Parsing complete: {record_count:,} records")
 
 
 @router.post("/import")
@@ -226,110 +295,163 @@ async def import_apple_health_data(file: UploadFile = File(...)):
                 detail="Neplatný súbor. Musí mať príponu .xml (napr. export.xml, export_small.xml)"
             )
         
-        # Načítať obsah
-        content = await file.read()
-        
-        # Parse XML
+        # Parse XML priamo zo SpooledTemporaryFile - bez kópie celého súboru
+        # do bytes (peak RAM by bol ~2x veľkosť exportu)
         print(f"[APPLE HEALTH] Parsing {file.filename}...")
-        parsed_data = parse_apple_health_xml(content)
-        
-        records = parsed_data["records"]
-        stats = parsed_data["stats"]
-        
-        print(f"[APPLE HEALTH] Found {len(records)} records")
-        
-        # Vygenerovať batch ID (pre tento import)
-        batch_id = str(uuid.uuid4())[:8]
-        
+        file.file.seek(0)
+
+        # Vygenerovať batch ID (pre tento import) - hex bez formátovania
+        # pomlčiek a hlavne bez kolízií, ktoré hrozili pri orezaní na 8 znakov
+        batch_id = uuid.uuid4().hex
+
         # Uložiť do databázy (optimalizované pre veľké súbory)
         session = get_session()
-        
-        saved_count = 0
-        skipped_count = 0
-        duplicate_count = 0
-        batch_buffer = []
-        BATCH_SIZE = 5000  # Commit každých 5000 záznamov (rýchlejšie pre veľké súbory)
-        
-        print(f"[APPLE HEALTH] Starting import of {len(records)} records...")
-        print(f"[APPLE HEALTH] Checking for duplicates...")
-        
-        for idx, record in enumerate(records):
+
+        stats = _new_parse_stats()
+        counters = {"saved": 0, "skipped": 0, "duplicates": 0}
+        BATCH_SIZE = 5000
+        # Producer/consumer: parsovanie je CPU-bound, insert I/O-bound -
+        # fronta dávok ich nechá bežať súbežne namiesto seriovo
+        batch_queue = queue.Queue(maxsize=8)
+        errors = []
+
+        def producer():
+            """Parsuje XML a tlačí dávky záznamov do fronty"""
             try:
-                # Iba záznamy s hodnotou
-                if record["value"] is None:
-                    skipped_count += 1
-                    continue
-                
-                # ✅ DUPLICATE CHECK - Skontroluj, či záznam už existuje
-                existing = session.query(AppleHealthData).filter_by(
-                    record_type=record["type"],
-                    start_date=record["start_date"],
-                    value=record["value"],
-                    unit=record["unit"]
-                ).first()
-                
-                if existing:
-                    duplicate_count += 1
-                    continue  # Preskočiť duplikát
-                
-                # Vytvoriť záznam
-                health_record = AppleHealthData(
-                    patient_id=1,  # Default patient
-                    record_type=record["type"],
-                    value=record["value"],
-                    unit=record["unit"],
-                    start_date=record["start_date"],
-                    end_date=record["end_date"],
-                    creation_date=record["creation_date"],
-                    source_name=record["source_name"],
-                    source_version=record["source_version"],
-                    device_name=record["device"].get("name") if record["device"] else None,
-                    device_manufacturer=record["device"].get("manufacturer") if record["device"] else None,
-                    device_model=record["device"].get("model") if record["device"] else None,
-                    device_hardware=record["device"].get("hardware") if record["device"] else None,
-                    device_software=record["device"].get("software") if record["device"] else None,
-                    record_metadata=record["metadata"],
-                    import_batch_id=batch_id
-                )
-                
-                batch_buffer.append(health_record)
-                saved_count += 1
-                
-                # Bulk insert každých BATCH_SIZE záznamov (rýchlejšie)
-                if len(batch_buffer) >= BATCH_SIZE:
-                    session.bulk_save_objects(batch_buffer)
-                    session.commit()
-                    progress_percent = int((idx / len(records)) * 100)
-                    print(f"[APPLE HEALTH] Progress: {saved_count:,} records ({progress_percent}%)...")
-                    batch_buffer = []
-                
+                batch = []
+                for record in iter_apple_health_records(file.file, stats):
+                    batch.append(record)
+                    if len(batch) >= BATCH_SIZE:
+                        batch_queue.put(batch)
+                        batch = []
+                if batch:
+                    batch_queue.put(batch)
             except Exception as e:
-                print(f"[APPLE HEALTH] Error saving record: {e}")
-                skipped_count += 1
-                continue
-        
-        # Final commit (zvyšné záznamy)
-        if batch_buffer:
-            session.bulk_save_objects(batch_buffer)
+                errors.append(e)
+            finally:
+                batch_queue.put(None)  # Sentinel - koniec streamu
+
+        def consumer():
+            """Dedup + Core insert, beží súbežne s parsovaním"""
+            # ✅ DUPLICATE CHECK - jedna hromadná query namiesto N round-tripov;
+            # existujúce záznamy ako set kľúčov, kontrola je potom O(1) lookup
+            print(f"[APPLE HEALTH] Checking for duplicates...")
+            existing_keys = set(
+                session.query(
+                    AppleHealthData.record_type,
+                    AppleHealthData.start_date,
+                    AppleHealthData.value,
+                    AppleHealthData.unit
+                ).all()
+            )
+
+            batch_buffer = []
+            try:
+                while True:
+                    item = batch_queue.get()
+                    if item is None:
+                        break
+
+                    for record in item:
+                        # Iba záznamy s hodnotou
+                        if record["value"] is None:
+                            counters["skipped"] += 1
+                            continue
+
+                        key = (record["type"], record["start_date"], record["value"], record["unit"])
+                        if key in existing_keys:
+                            counters["duplicates"] += 1
+                            continue  # Preskočiť duplikát
+                        existing_keys.add(key)  # Dedup aj v rámci práve importovaného súboru
+
+                        # Obyčajný dict namiesto ORM inštancie - Core insert nevytvára
+                        # 20-poľové Python objekty ani unit-of-work bookkeeping
+                        device = record["device"]
+                        batch_buffer.append({
+                            "patient_id": 1,  # Default patient
+                            "record_type": record["type"],
+                            "value": record["value"],
+                            "unit": record["unit"],
+                            "start_date": record["start_date"],
+                            "end_date": record["end_date"],
+                            "creation_date": record["creation_date"],
+                            "source_name": record["source_name"],
+                            "source_version": record["source_version"],
+                            "device_name": device.get("name") if device else None,
+                            "device_manufacturer": device.get("manufacturer") if device else None,
+                            "device_model": device.get("model") if device else None,
+                            "device_hardware": device.get("hardware") if device else None,
+                            "device_software": device.get("software") if device else None,
+                            "record_metadata": record["metadata"],
+                            "import_batch_id": batch_id
+                        })
+                        counters["saved"] += 1
+
+                        # Bulk insert každých BATCH_SIZE záznamov cez Core executemany,
+                        # celý import beží v jednej transakcii (commit až na konci)
+                        if len(batch_buffer) >= BATCH_SIZE:
+                            # OR IGNORE: unique constraint uq_ahd_dedup rieši duplicity
+                            # priamo v engine, set kontrola vyššie drží presné počty
+                            session.execute(
+                                AppleHealthData.__table__.insert().prefix_with("OR IGNORE"),
+                                batch_buffer
+                            )
+                            print(f"[APPLE HEALTH] Progress: {counters['saved']:,} records...")
+                            batch_buffer = []
+            except Exception as e:
+                errors.append(e)
+                # Dovyprázdniť frontu, aby producent nezostal visieť na put()
+                # (finálny None je garantovaný vo finally producenta)
+                while batch_queue.get() is not None:
+                    pass
+                return
+
+            if errors:
+                # Producent zlyhal uprostred parsovania - nič nekomitnúť
+                session.rollback()
+                return
+
+            # Zvyšné záznamy + jeden finálny commit celej transakcie
+            if batch_buffer:
+                session.execute(
+                    AppleHealthData.__table__.insert().prefix_with("OR IGNORE"),
+                    batch_buffer
+                )
             session.commit()
-        
+
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(
+            loop.run_in_executor(None, producer),
+            loop.run_in_executor(None, consumer),
+        )
+
         session.close()
-        
+
+        if errors:
+            raise errors[0]
+
+        saved_count = counters["saved"]
+        skipped_count = counters["skipped"]
+        duplicate_count = counters["duplicates"]
+
+        # Nové dáta - zahodiť memoizované dashboard agregácie
+        _aggregate_daily_cached.cache_clear()
+
         print(f"[APPLE HEALTH] Import complete: {saved_count} saved, {skipped_count} skipped, {duplicate_count} duplicates")
-        
-        return JSONResponse(content={
+
+        return ORJSONResponse(content={
             "success": True,
             "message": f"Import úspešný! Importovaných {saved_count} nových záznamov, {duplicate_count} duplikátov preskočených.",
             "batch_id": batch_id,
             "stats": {
-                "total_records": len(records),
+                "total_records": stats["total_records"],
                 "saved": saved_count,
                 "skipped": skipped_count,
                 "duplicates": duplicate_count,
                 "by_type": stats["by_type"],
                 "date_range": {
-                    "start": stats["date_range"]["start"].isoformat() if stats["date_range"]["start"] else None,
-                    "end": stats["date_range"]["end"].isoformat() if stats["date_range"]["end"] else None
+                    "start": stats["date_range"]["start"],
+                    "end": stats["date_range"]["end"]
                 }
             }
         })
@@ -349,7 +471,6 @@ async def get_apple_health_stats():
         total_records = session.query(AppleHealthData).count()
         
         # By type
-        from sqlalchemy import func
         by_type = session.query(
             AppleHealthData.record_type,
             func.count(AppleHealthData.id).label('count')
@@ -377,15 +498,15 @@ async def get_apple_health_stats():
         
         session.close()
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "total_records": total_records,
             "by_type": by_type_dict,
             "date_range": {
-                "start": date_range.start.isoformat() if date_range.start else None,
-                "end": date_range.end.isoformat() if date_range.end else None
+                "start": date_range.start,
+                "end": date_range.end
             },
             "devices": devices,
-            "latest_import": latest_import.isoformat() if latest_import else None
+            "latest_import": latest_import
         })
         
     except Exception as e:
@@ -438,13 +559,13 @@ async def get_apple_health_data_by_type(
                 "friendly_name": APPLE_HEALTH_TYPE_MAPPING.get(record.record_type, record.record_type),
                 "value": record.value,
                 "unit": record.unit,
-                "start_date": record.start_date.isoformat() if record.start_date else None,
-                "end_date": record.end_date.isoformat() if record.end_date else None,
+                "start_date": record.start_date,
+                "end_date": record.end_date,
                 "source": record.source_name,
                 "device": record.device_name
             })
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "record_type": record_type,
             "friendly_name": APPLE_HEALTH_TYPE_MAPPING.get(record_type, record_type),
             "count": len(result),
@@ -466,7 +587,7 @@ async def delete_all_apple_health_data():
         session.commit()
         session.close()
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "success": True,
             "message": f"Vymazaných {count} záznamov"
         })
@@ -495,88 +616,128 @@ async def get_available_types():
         # Sort by friendly name
         result.sort(key=lambda x: x["name"])
         
-        return JSONResponse(content={"types": result})
+        return ORJSONResponse(content={"types": result})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Chyba: {str(e)}")
 
 
+@lru_cache(maxsize=64)
+def _aggregate_daily_cached(record_type: str, days: int, time_bucket: int):
+    """Agreguje denné hodnoty pre daný typ metriky
+
+    Jeden SQL GROUP BY po dňoch - agregácia beží v DB engine, do Pythonu
+    ide len pár riadkov denných súhrnov namiesto všetkých surových záznamov.
+
+    time_bucket (60s okno) je súčasťou kľúča - lacná TTL invalidácia pre
+    dashboard, ktorý polluje ten istý endpoint každých pár sekúnd. Import
+    nových dát navyše volá cache_clear().
+    """
+    session = get_session()
+    try:
+        start_date = datetime.now() - timedelta(days=days)
+        # func.date() vracia 'YYYY-MM-DD' text; CAST(... AS DATE) má na
+        # SQLite NUMERIC afinitu a zredukoval by GROUP BY na rok
+        day_col = func.date(AppleHealthData.start_date).label('d')
+        rows = session.query(
+            day_col,
+            func.sum(AppleHealthData.value),
+            func.avg(AppleHealthData.value),
+            func.max(AppleHealthData.value),
+            func.min(AppleHealthData.value)
+        ).filter(
+            AppleHealthData.record_type == record_type,
+            AppleHealthData.start_date >= start_date,
+            AppleHealthData.value.isnot(None)
+        ).group_by(day_col).order_by(day_col).all()
+    finally:
+        session.close()
+
+    return [
+        {
+            'date': day, 'sum': float(s), 'mean': float(m),
+            'max': float(mx), 'min': float(mn)
+        }
+        for day, s, m, mx, mn in rows
+    ]
+
+
 @router.get("/sport-stats")
 async def get_sport_statistics():
     """Získať agregované športové štatistiky pre dashboard"""
     try:
-        from sqlalchemy import func
-        from datetime import timedelta
-        import pandas as pd
-        
-        session = get_session()
         now = datetime.now()
-        
-        # Helper funkcia pre agregáciu
-        def aggregate_daily(record_type: str, days: int = 7):
-            """Agreguje denné hodnoty pre daný typ metriky"""
-            start_date = now - timedelta(days=days)
-            records = session.query(AppleHealthData).filter(
-                AppleHealthData.record_type == record_type,
-                AppleHealthData.start_date >= start_date
-            ).all()
-            
-            if not records:
-                return []
-            
-            df = pd.DataFrame([{
-                'date': r.start_date.date(),
-                'value': r.value
-            } for r in records])
-            
-            # Group by date and sum/avg
-            daily = df.groupby('date')['value'].agg(['sum', 'mean', 'max', 'min']).reset_index()
-            daily['date'] = daily['date'].astype(str)
-            return daily.to_dict('records')
-        
+        time_bucket = int(time.time() // 60)
+
+        def fetch_sleep_rows():
+            # Spánok má vlastnú session - beží v executor threade súbežne
+            # s agregáciami (WAL povoľuje paralelné čítanie)
+            session = get_session()
+            try:
+                return session.query(
+                    AppleHealthData.start_date, AppleHealthData.end_date
+                ).filter(
+                    AppleHealthData.record_type == 'HKCategoryTypeIdentifierSleepAnalysis',
+                    AppleHealthData.start_date >= now - timedelta(days=7),
+                    AppleHealthData.end_date.isnot(None)
+                ).all()
+            finally:
+                session.close()
+
+        # Agregácie sú nezávislé SELECT-y - spustiť ich súbežne v thread poole,
+        # latencia endpointu je max(query) namiesto sum(queries)
+        loop = asyncio.get_running_loop()
+        (steps_data, hr_data, resting_hr_data, calories_data,
+         distance_data, weight_data, bmi_data, sleep_rows) = await asyncio.gather(*[
+            loop.run_in_executor(None, _aggregate_daily_cached, record_type, days, time_bucket)
+            for record_type, days in (
+                ('HKQuantityTypeIdentifierStepCount', 30),
+                ('HKQuantityTypeIdentifierHeartRate', 7),
+                ('HKQuantityTypeIdentifierRestingHeartRate', 7),
+                ('HKQuantityTypeIdentifierActiveEnergyBurned', 7),
+                ('HKQuantityTypeIdentifierDistanceWalkingRunning', 7),
+                ('HKQuantityTypeIdentifierBodyMass', 30),
+                ('HKQuantityTypeIdentifierBodyMassIndex', 30),
+            )
+        ] + [loop.run_in_executor(None, fetch_sleep_rows)])
+
         # KROKY
-        steps_data = aggregate_daily('HKQuantityTypeIdentifierStepCount', 30)
         steps_today = steps_data[-1]['sum'] if steps_data else 0
         steps_7d = sum(d['sum'] for d in steps_data[-7:]) / 7 if len(steps_data) >= 7 else 0
         steps_30d = sum(d['sum'] for d in steps_data) / len(steps_data) if steps_data else 0
         steps_trend = 'up' if steps_7d > steps_30d else 'down' if steps_7d < steps_30d * 0.9 else 'stable'
         
         # SRDCOVÝ TEP
-        hr_data = aggregate_daily('HKQuantityTypeIdentifierHeartRate', 7)
         hr_current = hr_data[-1]['mean'] if hr_data else 0
         hr_max = hr_data[-1]['max'] if hr_data else 0
         hr_7d = sum(d['mean'] for d in hr_data) / len(hr_data) if hr_data else 0
-        
-        resting_hr_data = aggregate_daily('HKQuantityTypeIdentifierRestingHeartRate', 7)
+
         resting_hr = resting_hr_data[-1]['mean'] if resting_hr_data else 0
-        
-        # SPÁNOK (v hodinách)
-        sleep_records = session.query(AppleHealthData).filter(
-            AppleHealthData.record_type == 'HKCategoryTypeIdentifierSleepAnalysis',
-            AppleHealthData.start_date >= now - timedelta(days=7)
-        ).all()
-        
-        sleep_by_day = {}
-        for r in sleep_records:
-            day = r.start_date.date()
-            if day not in sleep_by_day:
-                sleep_by_day[day] = 0
-            # Vypočítame dĺžku spánku v hodinách
-            if r.end_date and r.start_date:
-                duration_hours = (r.end_date - r.start_date).total_seconds() / 3600
-                sleep_by_day[day] += duration_hours
-        
-        sleep_history = [{'date': str(d), 'hours': h} for d, h in sorted(sleep_by_day.items())]
+
+        # SPÁNOK (v hodinách) - namiesto ORM objektov a dict slučky sa ťahajú
+        # len (start, end) tuple a trvanie + denné súčty počíta NumPy nad
+        # plochými poľami (SoA) jedným prechodom
+        if sleep_rows:
+            day_ords = np.array([r[0].toordinal() for r in sleep_rows], dtype=np.int64)
+            duration_hours = np.array(
+                [(r[1] - r[0]).total_seconds() for r in sleep_rows], dtype=np.float64
+            ) / 3600.0
+            uniq_days, inv = np.unique(day_ords, return_inverse=True)
+            daily_hours = np.bincount(inv, weights=duration_hours)
+            sleep_history = [
+                {'date': str(date.fromordinal(int(d))), 'hours': float(h)}
+                for d, h in zip(uniq_days, daily_hours)
+            ]
+        else:
+            sleep_history = []
         sleep_last = sleep_history[-1]['hours'] if sleep_history else 0
         sleep_7d = sum(d['hours'] for d in sleep_history) / len(sleep_history) if sleep_history else 0
         sleep_30d = sleep_7d  # Simplified
         sleep_quality = 'good' if sleep_last >= 7 else 'fair' if sleep_last >= 6 else 'poor'
         
         # AKTIVITA & KALÓRIE
-        calories_data = aggregate_daily('HKQuantityTypeIdentifierActiveEnergyBurned', 7)
         calories_today = calories_data[-1]['sum'] if calories_data else 0
-        
-        distance_data = aggregate_daily('HKQuantityTypeIdentifierDistanceWalkingRunning', 7)
+
         distance_today = distance_data[-1]['sum'] / 1000 if distance_data else 0  # convert m to km
         
         # Spojíme kalórie a aktívne minúty (estimované z krokov/vzdialenosti)
@@ -589,12 +750,10 @@ async def get_sport_statistics():
             })
         
         # HMOTNOSŤ
-        weight_data = aggregate_daily('HKQuantityTypeIdentifierBodyMass', 30)
         weight_current = weight_data[-1]['mean'] if weight_data else 0
         weight_7d_ago = weight_data[-7]['mean'] if len(weight_data) >= 7 else weight_current
         weight_trend = weight_current - weight_7d_ago
-        
-        bmi_data = aggregate_daily('HKQuantityTypeIdentifierBodyMassIndex', 30)
+
         bmi_current = bmi_data[-1]['mean'] if bmi_data else 0
         
         weight_history = []
@@ -605,10 +764,8 @@ async def get_sport_statistics():
             if matching_bmi:
                 entry['bmi'] = round(matching_bmi['mean'], 1)
             weight_history.append(entry)
-        
-        session.close()
-        
-        return JSONResponse(content={
+
+        return ORJSONResponse(content={
             "steps": {
                 "today": int(steps_today),
                 "avg_7d": int(steps_7d),
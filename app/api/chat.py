@@ -1,18 +1,95 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, Dict, Any
+import asyncio
+import logging
+import threading
+import heapq
+from collections import OrderedDict, defaultdict
+from hashlib import blake2b
 import anthropic
+import orjson
 from app.config import settings
 
+try:
+    from mistralai.async_client import MistralAsyncClient
+except Exception:
+    MistralAsyncClient = None
+
 try:
     from mistralai.client import MistralClient
 except Exception:
     MistralClient = None
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
+# Statické časti promptov ako konštanty - nič sa neskladá per request a
+# identický prefix maximalizuje hit rate prompt cache na strane API
+SYSTEM_PROMPT = """Si odborný zdravotný asistent s hlbokými znalosťami medicíny.
+Tvoja úloha je odpovedať na otázky pacienta o jeho zdravotných výsledkoch.
+
+DÔLEŽITÉ PRAVIDLÁ:
+- Odpovedaj VÝHRADNE v slovenskom jazyku
+- Buď presný, faktický a opieraj sa len o poskytnuté dáta
+- Ak nemáš dostatok informácií, oznám to pacientovi
+- Nikdy nediagnostikuj choroby - len informuj o hodnotách a trendoch
+- Odporúčaj konzultáciu s lekárom pri akýchkoľvek abnormálnych hodnotách
+- Buď empatický a zrozumiteľný
+- Vysvetľuj medicínske pojmy jednoducho"""
+
+USER_PROMPT_TEMPLATE = """ZDRAVOTNÉ DÁTA PACIENTA:
+{context}
+
+OTÁZKA PACIENTA:
+{question}
+
+Prosím, odpovedz na túto otázku na základe poskytnutých zdravotných dát."""
+
+
+def _max_tokens_for(question: str) -> int:
+    """Strop výstupných tokenov podľa dĺžky otázky
+
+    Floor 1024: aj krátka otázka ("Čo znamenajú moje výsledky?") často
+    potrebuje dlhé vysvetlenie - dĺžka otázky nepredpovedá dĺžku odpovede,
+    takže strop len mierne rastie k plnému rozpočtu pri rozsiahlych otázkach.
+    """
+    return min(2048, 1024 + 8 * len(question.split()))
+
+# Lazy singletony LLM klientov - klient drží httpx connection pool, takže
+# opakované requesty zdieľajú TCP/TLS spojenie namiesto nového handshake
+# pri každom volaní. Kľúčované API kľúčom (zmena .env za behu = nový klient).
+# Async varianty: LLM volanie trvá sekundy a sync klient by na ten čas
+# zablokoval celý event loop - await pustí medzitým ostatné requesty.
+_client_lock = threading.Lock()
+_mistral_clients: Dict[str, Any] = {}
+_anthropic_clients: Dict[str, Any] = {}
+
+
+def _get_mistral_client(api_key: str):
+    with _client_lock:
+        client = _mistral_clients.get(api_key)
+        if client is None:
+            cls = MistralAsyncClient if MistralAsyncClient is not None else MistralClient
+            client = _mistral_clients[api_key] = cls(api_key=api_key)
+        return client
+
+
+def _get_anthropic_client(api_key: str):
+    with _client_lock:
+        client = _anthropic_clients.get(api_key)
+        if client is None:
+            client = _anthropic_clients[api_key] = anthropic.AsyncAnthropic(api_key=api_key)
+        return client
+
 
 class ChatRequest(BaseModel):
+    # frozen: validácia zostáva čisto v Rust pydantic-core a model netreba
+    # kopírovať pri zdieľaní medzi vrstvami
+    model_config = ConfigDict(str_strip_whitespace=True, frozen=True)
+
     question: str
     health_data: Optional[Dict[str, Any]] = None
 
@@ -30,46 +107,40 @@ async def ask_question(request: ChatRequest):
         # Pripravíme kontext zo zdravotných dát
         context = _prepare_health_context(request.health_data)
         
-        # Vytvoríme prompt pre Claude AI
-        system_prompt = """Si odborný zdravotný asistent s hlbokými znalosťami medicíny. 
-Tvoja úloha je odpovedať na otázky pacienta o jeho zdravotných výsledkoch.
-
-DÔLEŽITÉ PRAVIDLÁ:
-- Odpovedaj VÝHRADNE v slovenskom jazyku
-- Buď presný, faktický a opieraj sa len o poskytnuté dáta
-- Ak nemáš dostatok informácií, oznám to pacientovi
-- Nikdy nediagnostikuj choroby - len informuj o hodnotách a trendoch
-- Odporúčaj konzultáciu s lekárom pri akýchkoľvek abnormálnych hodnotách
-- Buď empatický a zrozumiteľný
-- Vysvetľuj medicínske pojmy jednoducho"""
-
-        user_prompt = f"""ZDRAVOTNÉ DÁTA PACIENTA:
-{context}
-
-OTÁZKA PACIENTA:
-{request.question}
-
-Prosím, odpovedz na túto otázku na základe poskytnutých zdravotných dát."""
+        # Prompty sú predpripravené konštanty, skladá sa len dynamický obsah
+        user_prompt = USER_PROMPT_TEMPLATE.format(context=context, question=request.question)
 
         # Prefer Mistral, fallback na Claude
-        if settings.MISTRAL_API_KEY and MistralClient is not None:
-            client = MistralClient(api_key=settings.MISTRAL_API_KEY)
-            response = client.chat(
+        if settings.MISTRAL_API_KEY and (MistralAsyncClient is not None or MistralClient is not None):
+            client = _get_mistral_client(settings.MISTRAL_API_KEY)
+            chat_kwargs = dict(
                 model="mistral-small-latest",
                 messages=[
-                    {"role": "system", "content": system_prompt},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": user_prompt},
                 ],
                 temperature=0.3,
-                max_tokens=2048,
+                max_tokens=_max_tokens_for(request.question),
             )
+            if MistralAsyncClient is not None:
+                response = await client.chat(**chat_kwargs)
+            else:
+                # Starší balík bez async klienta - aspoň neblokovať event loop
+                response = await asyncio.to_thread(client.chat, **chat_kwargs)
             answer = response.choices[0].message.content
         elif settings.ANTHROPIC_API_KEY:
-            client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-            message = client.messages.create(
+            client = _get_anthropic_client(settings.ANTHROPIC_API_KEY)
+            message = await client.messages.create(
                 model="claude-3-haiku-20240307",
-                max_tokens=2048,
-                system=system_prompt,
+                max_tokens=_max_tokens_for(request.question),
+                # cache_control: statický systémový prompt sa KV-cachuje na
+                # strane Anthropic - opakované volania platia ~10% ceny
+                # vstupných tokenov a prefill je výrazne rýchlejší
+                system=[{
+                    "type": "text",
+                    "text": SYSTEM_PROMPT,
+                    "cache_control": {"type": "ephemeral"},
+                }],
                 messages=[
                     {
                         "role": "user",
@@ -84,51 +155,131 @@ Prosím, odpovedz na túto otázku na základe poskytnutých zdravotných dát."
         return ChatResponse(answer=answer)
         
     except Exception as e:
-        print(f"[CHAT ERROR] {str(e)}")
+        logger.exception("[CHAT ERROR] %s", e)
         raise HTTPException(status_code=500, detail=f"Chyba pri spracovaní otázky: {str(e)}")
 
 
+@router.post("/ask/stream")
+async def ask_question_stream(request: ChatRequest):
+    """
+    Streamovaná verzia /ask - odpoveď sa posiela ako SSE tokeny priebežne,
+    prvý token dorazí za stovky ms namiesto čakania na celú generáciu
+    """
+    context = _prepare_health_context(request.health_data)
+    user_prompt = USER_PROMPT_TEMPLATE.format(context=context, question=request.question)
+
+    # Prefer Mistral, fallback na Claude (rovnako ako /ask)
+    if settings.MISTRAL_API_KEY and MistralAsyncClient is not None:
+        client = _get_mistral_client(settings.MISTRAL_API_KEY)
+
+        async def generate():
+            try:
+                async for chunk in client.chat_stream(
+                    model="mistral-small-latest",
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_prompt},
+                    ],
+                    temperature=0.3,
+                    max_tokens=_max_tokens_for(request.question),
+                ):
+                    text = chunk.choices[0].delta.content
+                    if text:
+                        yield f"data: {orjson.dumps({'text': text}).decode()}\n\n"
+                yield "data: [DONE]\n\n"
+            except Exception as e:
+                logger.exception("[CHAT ERROR] %s", e)
+                yield f"data: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+
+    elif settings.ANTHROPIC_API_KEY:
+        client = _get_anthropic_client(settings.ANTHROPIC_API_KEY)
+
+        async def generate():
+            try:
+                async with client.messages.stream(
+                    model="claude-3-haiku-20240307",
+                    max_tokens=_max_tokens_for(request.question),
+                    system=[{
+                        "type": "text",
+                        "text": SYSTEM_PROMPT,
+                        "cache_control": {"type": "ephemeral"},
+                    }],
+                    messages=[{"role": "user", "content": user_prompt}],
+                ) as stream:
+                    async for text in stream.text_stream:
+                        yield f"data: {orjson.dumps({'text': text}).decode()}\n\n"
+                yield "data: [DONE]\n\n"
+            except Exception as e:
+                logger.exception("[CHAT ERROR] %s", e)
+                yield f"data: {orjson.dumps({'error': str(e)}).decode()}\n\n"
+
+    else:
+        raise HTTPException(status_code=500, detail="Chýba API kľúč pre Mistral alebo Claude. Pridaj MISTRAL_API_KEY alebo ANTHROPIC_API_KEY do .env")
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+# LRU cache kontextov - multi-turn konverzácia posiela ten istý health_data
+# blob dookola, kľúčom je hash kanonickej (sort_keys) orjson serializácie
+_CTX_CACHE: "OrderedDict[bytes, str]" = OrderedDict()
+_CTX_CACHE_MAX = 256
+_ctx_cache_lock = threading.Lock()
+
+
 def _prepare_health_context(health_data: Optional[Dict[str, Any]]) -> str:
     """Pripraví prehľadný kontext zo zdravotných dát"""
-    
+
     if not health_data:
         return "Žiadne zdravotné dáta nie sú momentálne dostupné."
-    
+
+    # Prázdny payload (bez metrík aj analýzy) - von ešte pred hashovaním
+    # a alokáciami, bežný prípad v multi-turn konverzáciách
+    if not (health_data.get("metrics") or health_data.get("analysis")):
+        return "Žiadne zdravotné dáta nie sú momentálne dostupné."
+
+    try:
+        key = blake2b(
+            orjson.dumps(health_data, option=orjson.OPT_SORT_KEYS),
+            digest_size=16,
+        ).digest()
+    except TypeError:
+        # Neserializovateľný payload - počítať bez cache
+        key = None
+
+    if key is not None:
+        with _ctx_cache_lock:
+            cached = _CTX_CACHE.get(key)
+            if cached is not None:
+                _CTX_CACHE.move_to_end(key)
+                return cached
+
     context_parts = []
-    
+
+    # Jedno naviazanie na lokálne premenné namiesto opakovaných dict lookupov
+    metrics = health_data.get("metrics")
+    analysis = health_data.get("analysis")
+
     # Metriky
-    if "metrics" in health_data and health_data["metrics"]:
+    if metrics:
         context_parts.append("=== ZDRAVOTNÉ METRIKY ===")
-        
+
         # Zoskupíme metriky podľa typu
-        metrics_by_type = {}
-        for metric in health_data["metrics"]:
-            metric_type = metric.get("type", "unknown")
-            if metric_type not in metrics_by_type:
-                metrics_by_type[metric_type] = []
-            metrics_by_type[metric_type].append(metric)
-        
-        # Výpis metrik
+        metrics_by_type = defaultdict(list)
+        for metric in metrics:
+            metrics_by_type[metric.get("type", "unknown")].append(metric)
+
+        # Výpis metrik - hlavička sa formátuje raz per typ, riadky idú ako
+        # jednotlivé kusy do finálneho "\n".join bez medzireťazcov
+        append = context_parts.append
         for metric_type, metrics in metrics_by_type.items():
-            context_parts.append(f"\n{metric_type.upper().replace('_', ' ')}:")
-            
-            # Zoradíme podľa dátumu
-            sorted_metrics = sorted(
-                metrics, 
-                key=lambda x: x.get("date", ""), 
-                reverse=True
-            )
-            
-            for metric in sorted_metrics[:5]:  # Max 5 najnovších hodnôt pre každý typ
-                date = metric.get("date", "N/A")
-                value = metric.get("value", "N/A")
-                unit = metric.get("unit", "")
-                context_parts.append(f"  - {date}: {value} {unit}")
+            append("\n" + metric_type.upper().replace("_", " ") + ":")
+
+            # Top 5 najnovších cez heap (O(n log 5)) namiesto full sortu skupiny
+            for metric in heapq.nlargest(5, metrics, key=lambda m: m.get("date", "")):
+                append(f"  - {metric.get('date', 'N/A')}: {metric.get('value', 'N/A')} {metric.get('unit', '')}")
     
     # Analýza a trendy
-    if "analysis" in health_data and health_data["analysis"]:
-        analysis = health_data["analysis"]
-        
+    if analysis:
         if "trends" in analysis:
             context_parts.append("\n=== TRENDY ===")
             for trend in analysis["trends"]:
@@ -146,4 +297,12 @@ def _prepare_health_context(health_data: Optional[Dict[str, Any]]) -> str:
             context_parts.append(f"\n=== CELKOVÉ ZDRAVOTNÉ SKÓRE ===")
             context_parts.append(f"  {score}/100")
     
-    return "\n".join(context_parts) if context_parts else "Žiadne zdravotné dáta nie sú momentálne dostupné."
+    context = "\n".join(context_parts) if context_parts else "Žiadne zdravotné dáta nie sú momentálne dostupné."
+
+    if key is not None:
+        with _ctx_cache_lock:
+            _CTX_CACHE[key] = context
+            if len(_CTX_CACHE) > _CTX_CACHE_MAX:
+                _CTX_CACHE.popitem(last=False)
+
+    return context
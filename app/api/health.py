@@ -1,11 +1,18 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+
+import orjson
 
 router = APIRouter()
 
+# Telo odpovede je nemenné - serializovať raz pri importe, liveness proby
+# (každých pár sekúnd) potom dostanú hotové bajty bez alokácie dictu
+_HEALTH_BODY = orjson.dumps({
+    "status": "healthy",
+    "service": "MedicalAI Backend"
+})
+
+
 @router.get("/status")
 async def health_status():
     """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "service": "MedicalAI Backend"
-    }
+    return Response(content=_HEALTH_BODY, media_type="application/json")
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from pydantic import BaseModel, ConfigDict, StringConstraints
+from typing import Annotated, Optional, Dict, Any, List
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
 
 try:
     from app.integrations.garmin_connector import get_garmin_connector
     GARMIN_AVAILABLE = True
 except Exception as e:
-    print(f"[INTEGRATIONS] Garmin connector not available: {e}")
+    logger.warning("[INTEGRATIONS] Garmin connector not available: %s", e)
     get_garmin_connector = None  # type: ignore
     GARMIN_AVAILABLE = False
 
@@ -15,7 +22,7 @@ try:
     from app.integrations.calendar_connector import get_calendar_connector
     CALENDAR_AVAILABLE = True
 except Exception as e:
-    print(f"[INTEGRATIONS] Calendar connector not available: {e}")
+    logger.warning("[INTEGRATIONS] Calendar connector not available: %s", e)
     get_calendar_connector = None  # type: ignore
     CALENDAR_AVAILABLE = False
 
@@ -23,15 +30,23 @@ router = APIRouter(prefix="/api/integrations", tags=["integrations"])
 
 
 class GarminAuthRequest(BaseModel):
-    email: str
+    model_config = ConfigDict(frozen=True)
+
+    # Strip len na emaile - heslo sa nesmie normalizovať, krajné medzery
+    # môžu byť jeho súčasťou
+    email: Annotated[str, StringConstraints(strip_whitespace=True)]
     password: str
 
 
 class SyncRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     days: int = 30
 
 
 class CorrelationAnalysisRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     days: int = 30
 
 
@@ -180,11 +195,14 @@ async def analyze_correlations(request: CorrelationAnalysisRequest):
                 detail="Both Garmin and Calendar must be authenticated"
             )
         
-        # Získať dáta
-        print(f"[CORRELATION] Analyzing correlations for last {request.days} days")
-        
-        garmin_data = await garmin.get_historical_data(request.days)
-        calendar_events = calendar.get_events(days_back=request.days, days_forward=0)
+        # Získať dáta - dva nezávislé sieťové round-tripy naraz, latencia je
+        # max(garmin, calendar) namiesto ich súčtu (sync calendar cez thread)
+        logger.info("[CORRELATION] Analyzing correlations for last %d days", request.days)
+
+        garmin_data, calendar_events = await asyncio.gather(
+            garmin.get_historical_data(request.days),
+            asyncio.to_thread(calendar.get_events, request.days, 0),
+        )
         
         # Analyzovať korelácie
         correlations = _analyze_health_event_correlations(garmin_data, calendar_events)
@@ -199,28 +217,38 @@ async def sync_garmin_background(days: int):
     """Background task pre synchronizáciu Garmin dát"""
     try:
         if not GARMIN_AVAILABLE or get_garmin_connector is None:
-            print("[GARMIN] Sync skipped: Garmin integrácia nie je dostupná.")
+            logger.warning("[GARMIN] Sync skipped: Garmin integrácia nie je dostupná.")
             return
         connector = get_garmin_connector()
         data = await connector.get_historical_data(days)
         
         # Uložiť do databázy/súboru
         from pathlib import Path
-        import json
-        
+        import time
+        import orjson
+
         data_dir = Path("data/garmin")
         data_dir.mkdir(parents=True, exist_ok=True)
-        
-        filename = f"garmin_sync_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+        # time_ns namiesto strftime - lacnejšie a dva syncy v tej istej
+        # sekunde si neprepisujú súbor
+        filename = f"garmin_sync_{time.time_ns()}.json"
         filepath = data_dir / filename
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"[GARMIN] Sync completed. Saved to {filepath}")
-    
+
+        # orjson serializuje multi-MB payload v C kóde a vždy ako UTF-8,
+        # jeden write namiesto stdlib json formattera
+        def _write(path, payload):
+            with open(path, 'wb') as f:
+                f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+
+        # Blokujúci zápis na disk do worker threadu - background task beží
+        # na event loope a veľký flush by zdržal ostatné requesty
+        await asyncio.to_thread(_write, filepath, data)
+
+        logger.info("[GARMIN] Sync completed. Saved to %s", filepath)
+
     except Exception as e:
-        print(f"[GARMIN ERROR] Background sync failed: {e}")
+        logger.exception("[GARMIN ERROR] Background sync failed: %s", e)
 
 
 def _analyze_health_event_correlations(
@@ -244,51 +272,56 @@ def _analyze_health_event_correlations(
     
     # Vytvoríme mapu dátumov
     garmin_by_date = {g["date"]: g for g in garmin_data}
-    
-    # Analyzujeme každý deň
-    for date, health_data in garmin_by_date.items():
-        stress = health_data.get("stress", {})
-        sleep = health_data.get("sleep", {})
-        steps = health_data.get("steps", {})
-        
-        avg_stress = stress.get("avg_stress_level", 0)
-        total_sleep = sleep.get("total_sleep_seconds", 0)
-        total_steps = steps.get("total_steps", 0)
-        
-        # Nájdeme udalosti pre tento deň
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        day_events = [
-            e for e in calendar_events 
-            if datetime.fromisoformat(e["start"]).date() == date_obj.date()
-        ]
-        
+
+    # Udalosti zoskupiť podľa dňa raz vopred - per-deň lookup je potom O(1)
+    # namiesto opakovaného fromisoformat parsovania celého zoznamu (O(N·M))
+    events_by_date = defaultdict(list)
+    for e in calendar_events:
+        events_by_date[datetime.fromisoformat(e["start"]).date()].append(e)
+
+    # Denné hodnoty do DataFrame - prahové filtre bežia ako vektorizované
+    # C porovnania namiesto Python slučky cez každý deň okna
+    if garmin_by_date:
+        df = pd.DataFrame([
+            {
+                "date": day,
+                "stress": g.get("stress", {}).get("avg_stress_level", 0) or 0,
+                "sleep_hours": (g.get("sleep", {}).get("total_sleep_seconds", 0) or 0) / 3600,
+                "steps": g.get("steps", {}).get("total_steps", 0) or 0,
+            }
+            for day, g in garmin_by_date.items()
+        ])
+
+        def _collect(sub_df, build_entry):
+            """Doplní udalosti dňa k riadkom, ktoré prešli filtrom (už ich je málo)"""
+            entries = []
+            for row in sub_df.itertuples(index=False):
+                # date.fromisoformat priamo na date objekt - bez medzikroku
+                # cez plný datetime a .date()
+                day_events = events_by_date.get(date.fromisoformat(row.date), [])
+                entry = build_entry(row)
+                entry["events"] = len(day_events)
+                entry["event_summaries"] = [e["summary"] for e in day_events[:3]]
+                entries.append(entry)
+            return entries
+
         # Vysoký stres?
-        if avg_stress > 60:
-            correlations["high_stress_days"].append({
-                "date": date,
-                "stress_level": avg_stress,
-                "events": len(day_events),
-                "event_summaries": [e["summary"] for e in day_events[:3]]
-            })
-        
+        correlations["high_stress_days"] = _collect(
+            df[df["stress"] > 60],
+            lambda r: {"date": r.date, "stress_level": float(r.stress)},
+        )
+
         # Zlý spánok?
-        sleep_hours = total_sleep / 3600 if total_sleep else 0
-        if sleep_hours > 0 and sleep_hours < 6:
-            correlations["poor_sleep_days"].append({
-                "date": date,
-                "sleep_hours": round(sleep_hours, 1),
-                "events": len(day_events),
-                "event_summaries": [e["summary"] for e in day_events[:3]]
-            })
-        
+        correlations["poor_sleep_days"] = _collect(
+            df[(df["sleep_hours"] > 0) & (df["sleep_hours"] < 6)],
+            lambda r: {"date": r.date, "sleep_hours": round(float(r.sleep_hours), 1)},
+        )
+
         # Nízka aktivita?
-        if total_steps > 0 and total_steps < 5000:
-            correlations["low_activity_days"].append({
-                "date": date,
-                "steps": total_steps,
-                "events": len(day_events),
-                "event_summaries": [e["summary"] for e in day_events[:3]]
-            })
+        correlations["low_activity_days"] = _collect(
+            df[(df["steps"] > 0) & (df["steps"] < 5000)],
+            lambda r: {"date": r.date, "steps": int(r.steps)},
+        )
     
     # Vytvoríme insights
     if correlations["high_stress_days"]:
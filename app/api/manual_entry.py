@@ -1,14 +1,35 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional, Dict, Any
+import asyncio
+import orjson
+from collections import Counter
 from datetime import date, datetime
-from app.database import get_session, Patient, FamilyMember, HealthRecord
-
+from itertools import chain
+from sqlalchemy import insert, select
+from app.database import (
+    get_session,
+    get_cached_patient_id,
+    invalidate_patient_cache,
+    Patient,
+    FamilyMember,
+    HealthRecord,
+)
+
+# Endpointy vracajú hotové dicty/ORJSONResponse - explicitné
+# response_model=None vypne Pydantic validáciu odpovede (FastAPI by inak
+# každé telo prehnal cez jsonable_encoder s inferovaným modelom)
 router = APIRouter(prefix="/api/manual", tags=["manual-entry"])
 
 
 # Pydantic models pre requesty
 class FamilyMemberCreate(BaseModel):
+    # Zdieľaná konfigurácia vstupných modelov - extra="forbid" odmietne
+    # preklepy v kľúčoch hneď pri validácii, strip medzier ako inde v API
+    model_config = ConfigDict(frozen=False, extra="forbid",
+                              str_strip_whitespace=True, use_enum_values=True)
+
     first_name: str
     last_name: str
     relationship_type: str  # mother, father, sister, brother, grandmother, grandfather
@@ -17,11 +38,11 @@ class FamilyMemberCreate(BaseModel):
     gender: str
     blood_type: Optional[str] = None
     
-    chronic_conditions: Optional[List[str]] = []
-    genetic_conditions: Optional[List[str]] = []
-    allergies: Optional[List[str]] = []
-    medications: Optional[List[Dict[str, str]]] = []
-    surgeries: Optional[List[Dict[str, str]]] = []
+    chronic_conditions: Optional[List[str]] = Field(default_factory=list)
+    genetic_conditions: Optional[List[str]] = Field(default_factory=list)
+    allergies: Optional[List[str]] = Field(default_factory=list)
+    medications: Optional[List[Dict[str, str]]] = Field(default_factory=list)
+    surgeries: Optional[List[Dict[str, str]]] = Field(default_factory=list)
     
     smoking: bool = False
     smoking_years: Optional[int] = None
@@ -33,6 +54,11 @@ class FamilyMemberCreate(BaseModel):
 
 
 class FamilyMemberUpdate(BaseModel):
+    # Zdieľaná konfigurácia vstupných modelov - extra="forbid" odmietne
+    # preklepy v kľúčoch hneď pri validácii, strip medzier ako inde v API
+    model_config = ConfigDict(frozen=False, extra="forbid",
+                              str_strip_whitespace=True, use_enum_values=True)
+
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     relationship_type: Optional[str] = None
@@ -57,6 +83,11 @@ class FamilyMemberUpdate(BaseModel):
 
 
 class HealthRecordCreate(BaseModel):
+    # Zdieľaná konfigurácia vstupných modelov - extra="forbid" odmietne
+    # preklepy v kľúčoch hneď pri validácii, strip medzier ako inde v API
+    model_config = ConfigDict(frozen=False, extra="forbid",
+                              str_strip_whitespace=True, use_enum_values=True)
+
     record_date: date
     metric_type: str  # glucose, blood_pressure, cholesterol, weight, etc.
     value: str  # "120/80", "5.4", "75.2"
@@ -70,6 +101,11 @@ class HealthRecordCreate(BaseModel):
 
 
 class PatientUpdate(BaseModel):
+    # Zdieľaná konfigurácia vstupných modelov - extra="forbid" odmietne
+    # preklepy v kľúčoch hneď pri validácii, strip medzier ako inde v API
+    model_config = ConfigDict(frozen=False, extra="forbid",
+                              str_strip_whitespace=True, use_enum_values=True)
+
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     date_of_birth: Optional[date] = None
@@ -82,20 +118,22 @@ class PatientUpdate(BaseModel):
 
 # === PATIENT ENDPOINTS ===
 
-@router.get("/patient")
+@router.get("/patient", response_model=None)
 async def get_patient_info():
     """Získať informácie o pacientovi"""
     session = get_session()
     try:
-        patient = session.query(Patient).first()
+        # Cachované ID + primary-key lookup namiesto full-scan query
+        pid = get_cached_patient_id(session)
+        patient = session.get(Patient, pid) if pid is not None else None
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
+
         return {
             "id": patient.id,
             "first_name": patient.first_name,
             "last_name": patient.last_name,
-            "date_of_birth": patient.date_of_birth.isoformat() if patient.date_of_birth else None,
+            "date_of_birth": patient.date_of_birth,  # date serializuje orjson natívne
             "gender": patient.gender,
             "blood_type": patient.blood_type,
             "height_cm": patient.height_cm,
@@ -106,36 +144,25 @@ async def get_patient_info():
         session.close()
 
 
-@router.put("/patient")
+@router.put("/patient", response_model=None)
 async def update_patient_info(data: PatientUpdate):
     """Aktualizovať informácie o pacientovi"""
     session = get_session()
     try:
-        patient = session.query(Patient).first()
+        pid = get_cached_patient_id(session)
+        patient = session.get(Patient, pid) if pid is not None else None
         if not patient:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
-        # Update fields
-        if data.first_name is not None:
-            patient.first_name = data.first_name
-        if data.last_name is not None:
-            patient.last_name = data.last_name
-        if data.date_of_birth is not None:
-            patient.date_of_birth = data.date_of_birth
-        if data.gender is not None:
-            patient.gender = data.gender
-        if data.blood_type is not None:
-            patient.blood_type = data.blood_type
-        if data.height_cm is not None:
-            patient.height_cm = data.height_cm
-        if data.email is not None:
-            patient.email = data.email
-        if data.phone is not None:
-            patient.phone = data.phone
-        
-        patient.updated_at = datetime.now()
+
+        # Len polia, ktoré klient naozaj poslal - UPDATE obsahuje iba
+        # zmenené stĺpce namiesto 8 vetvených priradení
+        for field, value in data.model_dump(exclude_unset=True).items():
+            setattr(patient, field, value)
+
+        # updated_at nastaví DB cez onupdate=func.now()
         session.commit()
-        
+        invalidate_patient_cache()
+
         return {"success": True, "message": "Patient info updated"}
     finally:
         session.close()
@@ -143,57 +170,72 @@ async def update_patient_info(data: PatientUpdate):
 
 # === FAMILY MEMBER ENDPOINTS ===
 
-@router.get("/family")
+@router.get("/family", response_model=None)
 async def get_family_members():
     """Získať všetkých rodinných príbuzných"""
+    # Sync SQLAlchemy do worker threadu - event loop medzitým obsluhuje
+    # ďalšie requesty (HTTPException sa z threadu normálne propaguje)
+    return await asyncio.to_thread(_get_family_members_sync)
+
+
+def _get_family_members_sync():
     session = get_session()
     try:
-        patient = session.query(Patient).first()
-        if not patient:
+        pid = get_cached_patient_id(session)
+        if pid is None:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
-        members = session.query(FamilyMember).filter_by(patient_id=patient.id).all()
-        
+
+        # Core select konkrétnych stĺpcov - bez ORM hydratácie celých
+        # inštancií, riadky idú ako mappingy rovno do orjson (dátumy
+        # serializuje orjson natívne ako ISO)
+        stmt = select(
+            FamilyMember.id,
+            FamilyMember.first_name,
+            FamilyMember.last_name,
+            FamilyMember.relationship_type,
+            FamilyMember.date_of_birth,
+            FamilyMember.date_of_death,
+            FamilyMember.gender,
+            FamilyMember.blood_type,
+            FamilyMember.chronic_conditions,
+            FamilyMember.genetic_conditions,
+            FamilyMember.allergies,
+            FamilyMember.medications,
+            FamilyMember.surgeries,
+            FamilyMember.smoking,
+            FamilyMember.smoking_years,
+            FamilyMember.alcohol,
+            FamilyMember.exercise_frequency,
+            FamilyMember.cause_of_death,
+            FamilyMember.notes,
+        ).where(FamilyMember.patient_id == pid)
+
         result = []
-        for member in members:
-            result.append({
-                "id": member.id,
-                "first_name": member.first_name,
-                "last_name": member.last_name,
-                "relationship_type": member.relationship_type,
-                "date_of_birth": member.date_of_birth.isoformat() if member.date_of_birth else None,
-                "date_of_death": member.date_of_death.isoformat() if member.date_of_death else None,
-                "gender": member.gender,
-                "blood_type": member.blood_type,
-                "chronic_conditions": member.chronic_conditions or [],
-                "genetic_conditions": member.genetic_conditions or [],
-                "allergies": member.allergies or [],
-                "medications": member.medications or [],
-                "surgeries": member.surgeries or [],
-                "smoking": member.smoking,
-                "smoking_years": member.smoking_years,
-                "alcohol": member.alcohol,
-                "exercise_frequency": member.exercise_frequency,
-                "cause_of_death": member.cause_of_death,
-                "notes": member.notes,
-            })
-        
-        return result
+        for row in session.execute(stmt).mappings():
+            member = dict(row)
+            # JSON stĺpce s NULL hodnotou ostávajú prázdny zoznam ako doteraz
+            for key in ('chronic_conditions', 'genetic_conditions',
+                        'allergies', 'medications', 'surgeries'):
+                if member[key] is None:
+                    member[key] = []
+            result.append(member)
+
+        return ORJSONResponse(result)
     finally:
         session.close()
 
 
-@router.post("/family")
+@router.post("/family", response_model=None)
 async def add_family_member(data: FamilyMemberCreate):
     """Pridať rodinného príbuzného"""
     session = get_session()
     try:
-        patient = session.query(Patient).first()
-        if not patient:
+        pid = get_cached_patient_id(session)
+        if pid is None:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
+
         member = FamilyMember(
-            patient_id=patient.id,
+            patient_id=pid,
             first_name=data.first_name,
             last_name=data.last_name,
             relationship_type=data.relationship_type,
@@ -226,54 +268,61 @@ async def add_family_member(data: FamilyMemberCreate):
         session.close()
 
 
-@router.put("/family/{member_id}")
+@router.post("/family/bulk", response_model=None)
+async def add_family_members_bulk(data: List[FamilyMemberCreate]):
+    """Pridať viacerých rodinných príbuzných naraz (jeden INSERT)"""
+    return await asyncio.to_thread(_add_family_members_bulk_sync, data)
+
+
+def _add_family_members_bulk_sync(data: List[FamilyMemberCreate]):
+    session = get_session()
+    try:
+        pid = get_cached_patient_id(session)
+        if pid is None:
+            raise HTTPException(status_code=404, detail="Patient not found")
+
+        if not data:
+            return {"success": True, "message": "No family members to add", "count": 0}
+
+        # Jeden INSERT .. RETURNING namiesto N commitov po jednom členovi -
+        # insertmanyvalues pošle celú dávku v jednom statemente a rovno
+        # vráti pridelené ID
+        rows = [{**member.model_dump(), "patient_id": pid} for member in data]
+        # sort_by_parameter_order: RETURNING riadky v poradí vstupných dát,
+        # klient páruje ids s odoslanými členmi pozične
+        ids = session.scalars(
+            insert(FamilyMember).returning(
+                FamilyMember.id, sort_by_parameter_order=True
+            ),
+            rows,
+        ).all()
+        session.commit()
+
+        return {
+            "success": True,
+            "message": f"Added {len(rows)} family members",
+            "count": len(rows),
+            "ids": ids,
+        }
+    finally:
+        session.close()
+
+
+@router.put("/family/{member_id}", response_model=None)
 async def update_family_member(member_id: int, data: FamilyMemberUpdate):
     """Aktualizovať rodinného príbuzného"""
     session = get_session()
     try:
-        member = session.query(FamilyMember).filter_by(id=member_id).first()
+        member = session.get(FamilyMember, member_id)
         if not member:
             raise HTTPException(status_code=404, detail="Family member not found")
         
-        # Update fields
-        if data.first_name is not None:
-            member.first_name = data.first_name
-        if data.last_name is not None:
-            member.last_name = data.last_name
-        if data.relationship_type is not None:
-            member.relationship_type = data.relationship_type
-        if data.date_of_birth is not None:
-            member.date_of_birth = data.date_of_birth
-        if data.date_of_death is not None:
-            member.date_of_death = data.date_of_death
-        if data.gender is not None:
-            member.gender = data.gender
-        if data.blood_type is not None:
-            member.blood_type = data.blood_type
-        if data.chronic_conditions is not None:
-            member.chronic_conditions = data.chronic_conditions
-        if data.genetic_conditions is not None:
-            member.genetic_conditions = data.genetic_conditions
-        if data.allergies is not None:
-            member.allergies = data.allergies
-        if data.medications is not None:
-            member.medications = data.medications
-        if data.surgeries is not None:
-            member.surgeries = data.surgeries
-        if data.smoking is not None:
-            member.smoking = data.smoking
-        if data.smoking_years is not None:
-            member.smoking_years = data.smoking_years
-        if data.alcohol is not None:
-            member.alcohol = data.alcohol
-        if data.exercise_frequency is not None:
-            member.exercise_frequency = data.exercise_frequency
-        if data.cause_of_death is not None:
-            member.cause_of_death = data.cause_of_death
-        if data.notes is not None:
-            member.notes = data.notes
-        
-        member.updated_at = datetime.now()
+        # Len polia, ktoré klient naozaj poslal (exclude_unset) - žiadnych
+        # 18 vetvených priradení a dirty sú iba zmenené stĺpce
+        for field, value in data.model_dump(exclude_unset=True).items():
+            setattr(member, field, value)
+
+        # updated_at nastaví DB cez onupdate=func.now()
         session.commit()
         
         return {"success": True, "message": "Family member updated"}
@@ -281,12 +330,12 @@ async def update_family_member(member_id: int, data: FamilyMemberUpdate):
         session.close()
 
 
-@router.delete("/family/{member_id}")
+@router.delete("/family/{member_id}", response_model=None)
 async def delete_family_member(member_id: int):
     """Vymazať rodinného príbuzného"""
     session = get_session()
     try:
-        member = session.query(FamilyMember).filter_by(id=member_id).first()
+        member = session.get(FamilyMember, member_id)
         if not member:
             raise HTTPException(status_code=404, detail="Family member not found")
         
@@ -300,17 +349,17 @@ async def delete_family_member(member_id: int):
 
 # === HEALTH RECORD ENDPOINTS ===
 
-@router.post("/health-record")
+@router.post("/health-record", response_model=None)
 async def add_health_record(data: HealthRecordCreate):
     """Manuálne pridať zdravotný záznam"""
     session = get_session()
     try:
-        patient = session.query(Patient).first()
-        if not patient:
+        pid = get_cached_patient_id(session)
+        if pid is None:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
+
         record = HealthRecord(
-            patient_id=patient.id,
+            patient_id=pid,
             record_type="manual_entry",
             record_date=data.record_date,
             source="manual",
@@ -337,50 +386,72 @@ async def add_health_record(data: HealthRecordCreate):
         session.close()
 
 
-@router.get("/health-records")
+@router.get("/health-records", response_model=None)
 async def get_health_records(metric_type: Optional[str] = None, limit: int = 100):
     """Získať zdravotné záznamy (s optional filtrom)"""
+    # 404 padne ešte pred odoslaním hlavičiek - z generátora nižšie sa už
+    # status meniť nedá
+    pid = await asyncio.to_thread(_resolve_patient_id)
+    return StreamingResponse(
+        _iter_health_records_json(pid, metric_type, limit),
+        media_type="application/json",
+    )
+
+
+def _resolve_patient_id() -> int:
     session = get_session()
     try:
-        patient = session.query(Patient).first()
-        if not patient:
+        pid = get_cached_patient_id(session)
+        if pid is None:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
-        query = session.query(HealthRecord).filter_by(patient_id=patient.id)
-        
+        return pid
+    finally:
+        session.close()
+
+
+def _iter_health_records_json(pid: int, metric_type: Optional[str], limit: int):
+    """Generátor JSON poľa po riadkoch - server-side cursor cez yield_per,
+    takže v pamäti nikdy nie je celý výsledok ani jeho dict kópia"""
+    session = get_session()
+    try:
+        # Rovnaký Core prístup ako /family - len potrebné stĺpce bez ORM objektov
+        stmt = select(
+            HealthRecord.id,
+            HealthRecord.record_date,
+            HealthRecord.metric_type,
+            HealthRecord.value,
+            HealthRecord.unit,
+            HealthRecord.reference_range,
+            HealthRecord.is_normal,
+            HealthRecord.interpretation,
+            HealthRecord.source,
+            HealthRecord.doctor_name,
+            HealthRecord.facility_name,
+            HealthRecord.notes,
+        ).where(HealthRecord.patient_id == pid)
+
         if metric_type:
-            query = query.filter_by(metric_type=metric_type)
-        
-        records = query.order_by(HealthRecord.record_date.desc()).limit(limit).all()
-        
-        result = []
-        for record in records:
-            result.append({
-                "id": record.id,
-                "record_date": record.record_date.isoformat(),
-                "metric_type": record.metric_type,
-                "value": record.value,
-                "unit": record.unit,
-                "reference_range": record.reference_range,
-                "is_normal": record.is_normal,
-                "interpretation": record.interpretation,
-                "source": record.source,
-                "doctor_name": record.doctor_name,
-                "facility_name": record.facility_name,
-                "notes": record.notes,
-            })
-        
-        return result
+            stmt = stmt.where(HealthRecord.metric_type == metric_type)
+
+        stmt = stmt.order_by(HealthRecord.record_date.desc()).limit(limit)
+
+        yield b"["
+        first = True
+        rows = session.execute(stmt.execution_options(yield_per=256)).mappings()
+        for row in rows:
+            yield (b"" if first else b",") + orjson.dumps(dict(row))
+            first = False
+        yield b"]"
     finally:
         session.close()
 
 
-@router.delete("/health-record/{record_id}")
+@router.delete("/health-record/{record_id}", response_model=None)
 async def delete_health_record(record_id: int):
     """Vymazať zdravotný záznam"""
     session = get_session()
     try:
-        record = session.query(HealthRecord).filter_by(id=record_id).first()
+        record = session.get(HealthRecord, record_id)
         if not record:
             raise HTTPException(status_code=404, detail="Health record not found")
         
@@ -394,33 +465,36 @@ async def delete_health_record(record_id: int):
 
 # === UTILITY ENDPOINTS ===
 
-@router.get("/genetic-risk-analysis")
+@router.get("/genetic-risk-analysis", response_model=None)
 async def analyze_genetic_risks():
     """Analyzovať genetické riziká na základe rodinnej anamnézy"""
+    return await asyncio.to_thread(_analyze_genetic_risks_sync)
+
+
+def _analyze_genetic_risks_sync():
     session = get_session()
     try:
-        patient = session.query(Patient).first()
-        if not patient:
+        pid = get_cached_patient_id(session)
+        if pid is None:
             raise HTTPException(status_code=404, detail="Patient not found")
-        
-        members = session.query(FamilyMember).filter_by(patient_id=patient.id).all()
-        
-        # Počítať výskyt chorôb v rodine
-        condition_counts = {}
-        genetic_conditions = {}
-        
-        for member in members:
-            # Chronické choroby
-            for condition in (member.chronic_conditions or []):
-                condition_counts[condition] = condition_counts.get(condition, 0) + 1
-            
-            # Genetické choroby
-            for condition in (member.genetic_conditions or []):
-                genetic_conditions[condition] = genetic_conditions.get(condition, 0) + 1
-        
-        # Vypočítať riziká
-        risks = []
-        
+
+        # Len dva JSON stĺpce bez ORM hydratácie; výskyty počíta Counter
+        # v C kóde namiesto ručnej dict slučky (na SQLite niet
+        # jsonb_array_elements, agregácia teda ostáva v Pythone)
+        rows = session.execute(
+            select(FamilyMember.chronic_conditions, FamilyMember.genetic_conditions)
+            .where(FamilyMember.patient_id == pid)
+        ).all()
+
+        condition_counts = Counter(chain.from_iterable(chronic or () for chronic, _ in rows))
+        genetic_conditions = Counter(chain.from_iterable(genetic or () for _, genetic in rows))
+
+        # Vypočítať riziká - sumár aj sort key sa počítajú rovno pri stavbe
+        # zoznamu, žiadne ďalšie prechody cez risks
+        risk_order = {"high": 0, "medium": 1, "low": 2}
+        level_counts = Counter()
+        keyed_risks = []
+
         # Vysoké riziko = 2+ príbuzní s rovnakou chorobou
         for condition, count in condition_counts.items():
             risk_level = "low"
@@ -428,34 +502,36 @@ async def analyze_genetic_risks():
                 risk_level = "high"
             elif count >= 2:
                 risk_level = "medium"
-            
-            risks.append({
+
+            level_counts[risk_level] += 1
+            keyed_risks.append(((risk_order[risk_level], -count), {
                 "condition": condition,
                 "family_members_affected": count,
                 "risk_level": risk_level,
                 "type": "chronic"
-            })
-        
+            }))
+
         # Genetické choroby = vždy vysoké riziko
         for condition, count in genetic_conditions.items():
-            risks.append({
+            level_counts["high"] += 1
+            keyed_risks.append(((0, -count), {
                 "condition": condition,
                 "family_members_affected": count,
                 "risk_level": "high",
                 "type": "genetic"
-            })
-        
-        # Zoradiť podľa rizika
-        risk_order = {"high": 0, "medium": 1, "low": 2}
-        risks.sort(key=lambda x: (risk_order[x["risk_level"]], -x["family_members_affected"]))
-        
+            }))
+
+        # Zoradiť podľa rizika - kľúč je predpočítaná dvojica, sort nesiaha
+        # do dictov
+        keyed_risks.sort(key=lambda kr: kr[0])
+
         return {
-            "total_family_members": len(members),
-            "risks": risks,
+            "total_family_members": len(rows),
+            "risks": [risk for _, risk in keyed_risks],
             "summary": {
-                "high_risk": len([r for r in risks if r["risk_level"] == "high"]),
-                "medium_risk": len([r for r in risks if r["risk_level"] == "medium"]),
-                "low_risk": len([r for r in risks if r["risk_level"] == "low"]),
+                "high_risk": level_counts["high"],
+                "medium_risk": level_counts["medium"],
+                "low_risk": level_counts["low"],
             }
         }
     finally:
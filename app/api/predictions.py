@@ -1,3 +1,5 @@
+import functools
+
 from fastapi import APIRouter, HTTPException
 from typing import Optional
 
@@ -6,9 +8,31 @@ from app.ml.recommendation_engine import RecommendationEngine
 from app.claude.medical_advisor import MedicalAdvisor
 
 router = APIRouter()
-risk_predictor = RiskPredictor()
-recommendation_engine = RecommendationEngine()
-medical_advisor = MedicalAdvisor()
+
+
+# Lazy singletony - konštruktory (načítanie dát, inicializácia klientov) sa
+# neplatia pri importe modulu, ale až pri prvom použití endpointu. Štart
+# uvicornu tým nezdržiavajú; main.py ich predhreje na startup evente.
+@functools.cache
+def _predictor() -> RiskPredictor:
+    return RiskPredictor()
+
+
+@functools.cache
+def _recommender() -> RecommendationEngine:
+    return RecommendationEngine()
+
+
+@functools.cache
+def _advisor() -> MedicalAdvisor:
+    return MedicalAdvisor()
+
+
+def warm_up():
+    """Predhreje všetky tri singletony mimo request hot path"""
+    _predictor()
+    _recommender()
+    _advisor()
 
 @router.get("/risks")
 async def predict_health_risks(use_claude: bool = False):
@@ -20,7 +44,7 @@ async def predict_health_risks(use_claude: bool = False):
     """
     try:
         # ML-based risk prediction
-        ml_risks = risk_predictor.predict_risks()
+        ml_risks = _predictor().predict_risks()
         
         result = {
             "ml_predictions": ml_risks,
@@ -30,7 +54,7 @@ async def predict_health_risks(use_claude: bool = False):
         
         # Optional Claude AI analysis
         if use_claude:
-            claude_analysis = await medical_advisor.analyze_health_risks(ml_risks)
+            claude_analysis = await _advisor().analyze_health_risks(ml_risks)
             result["ai_insights"] = claude_analysis
         
         return result
@@ -47,7 +71,7 @@ async def get_preventive_recommendations(age: Optional[int] = None):
     - age: Vek pacienta (ak nie je zadaný, vypočíta sa z dát)
     """
     try:
-        recommendations = recommendation_engine.generate_recommendations(age=age)
+        recommendations = _recommender().generate_recommendations(age=age)
         
         return {
             "preventive_tests": recommendations.get("tests", []),
@@ -74,7 +98,7 @@ async def get_specific_disease_risk(disease: str):
                 detail=f"Disease must be one of: {supported_diseases}"
             )
         
-        risk_assessment = risk_predictor.predict_disease_risk(disease)
+        risk_assessment = _predictor().predict_disease_risk(disease)
         
         return {
             "disease": disease,
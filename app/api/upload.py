@@ -1,9 +1,20 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Response, UploadFile, File, HTTPException
 from typing import List
+import asyncio
+import concurrent.futures
+import functools
+import multiprocessing
+import os
 import shutil
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import aiofiles
+    AIOFILES_AVAILABLE = True
+except ImportError:
+    AIOFILES_AVAILABLE = False
+
 from app.config import settings
 from app.ocr.document_processor import DocumentProcessor
 from app.ocr.data_extractor import HealthDataExtractor
@@ -14,6 +25,49 @@ doc_processor = DocumentProcessor()
 data_extractor = HealthDataExtractor()
 csv_importer = CSVImporter()
 
+# 1 MB bloky - dosť veľké na sekvenčný zápis, dosť malé na stabilnú pamäť
+_CHUNK_SIZE = 1 << 20
+
+# ProcessPool pre OCR - Tesseract je CPU-bound, takže thready by serializoval
+# GIL; worker procesy štartujú lenivo až pri prvom submite. spawn namiesto
+# fork: fork z bežiaceho uvicornu by zdedil event loop, logging thread a
+# SQLite file descriptory - čistý interpret je jediný bezpečný štart
+_PROCESS_POOL = concurrent.futures.ProcessPoolExecutor(
+    max_workers=os.cpu_count(),
+    mp_context=multiprocessing.get_context("spawn"),
+)
+
+
+def _process_one(file_path: Path, file_ext: str):
+    """Beží vo worker procese - OCR/CSV import + extrakcia pre jeden súbor"""
+    if file_ext == '.csv':
+        # CSV import - direct data entry
+        health_data = csv_importer.import_from_csv(file_path)
+        text_content = f"CSV import: {len(health_data)} records"
+    else:
+        # OCR processing for PDF/images
+        text_content = doc_processor.process_document(file_path)
+
+        # Extract health data
+        health_data = data_extractor.extract_health_metrics(text_content)
+
+    return len(text_content), len(health_data)
+
+
+async def _save_upload(file: UploadFile, file_path: Path):
+    """Uloží upload na disk bez blokovania event loopu"""
+    if AIOFILES_AVAILABLE:
+        async with aiofiles.open(file_path, "wb") as out:
+            while chunk := await file.read(_CHUNK_SIZE):
+                await out.write(chunk)
+    else:
+        # Fallback bez aiofiles - blokujúce kopírovanie vo worker threade
+        def _copy():
+            with file_path.open("wb") as buffer:
+                shutil.copyfileobj(file.file, buffer)
+
+        await asyncio.to_thread(_copy)
+
 @router.post("/documents")
 async def upload_documents(files: List[UploadFile] = File(...)):
     """
@@ -26,45 +80,47 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     """
     try:
         uploaded_files = []
-        
+
+        # Najprv validovať všetky súbory - 400 padne skôr, než sa čokoľvek uloží
+        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.csv'}
+        to_process = []
         for file in files:
-            # Validate file type
-            allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.csv'}
             file_ext = Path(file.filename).suffix.lower()
-            
+
             if file_ext not in allowed_extensions:
                 raise HTTPException(
                     status_code=400,
                     detail=f"File type {file_ext} not allowed. Allowed: {allowed_extensions}"
                 )
-            
+
             # Generate unique filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             safe_filename = f"{timestamp}_{file.filename}"
             file_path = settings.RAW_DATA_DIR / safe_filename
-            
-            # Save file
-            with file_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            # Process based on file type
-            if file_ext == '.csv':
-                # CSV import - direct data entry
-                health_data = csv_importer.import_from_csv(file_path)
-                text_content = f"CSV import: {len(health_data)} records"
-            else:
-                # OCR processing for PDF/images
-                text_content = doc_processor.process_document(file_path)
-                
-                # Extract health data
-                health_data = data_extractor.extract_health_metrics(text_content)
-            
+            to_process.append((file, file_ext, safe_filename, file_path))
+
+        # Zápisy na disk bežia súbežne a streamované po blokoch - event loop
+        # medzitým obsluhuje ďalšie requesty
+        await asyncio.gather(*[
+            _save_upload(file, file_path)
+            for file, _, _, file_path in to_process
+        ])
+
+        # OCR je CPU-bound a na súboroch nezávislé - každý ide do vlastného
+        # worker procesu, N súborov trvá max(t_i) namiesto sum(t_i)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(*[
+            loop.run_in_executor(_PROCESS_POOL, _process_one, file_path, file_ext)
+            for _, file_ext, _, file_path in to_process
+        ])
+
+        for (file, file_ext, safe_filename, file_path), (text_length, metrics_found) in zip(to_process, results):
             uploaded_files.append({
                 "filename": safe_filename,
                 "original_name": file.filename,
                 "path": str(file_path),
-                "extracted_text_length": len(text_content),
-                "health_metrics_found": len(health_data)
+                "extracted_text_length": text_length,
+                "health_metrics_found": metrics_found
             })
         
         return {
@@ -75,35 +131,39 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@functools.lru_cache(maxsize=1)
+def _csv_template_bytes() -> bytes:
+    return csv_importer.build_template_bytes()
+
+
 @router.get("/csv-template")
 async def download_csv_template():
     """Stiahne vzorový CSV súbor pre manuálny import dát"""
-    try:
-        template_path = settings.DATA_DIR / "health_data_template.csv"
-        csv_importer.create_template_csv(template_path)
-        
-        return {
-            "message": "CSV template created",
-            "path": str(template_path),
-            "instructions": "Fill in your health data and upload via /api/upload/documents"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Šablóna sa generuje raz v pamäti a vracia priamo ako attachment -
+    # klient nemusí robiť druhý request na cestu a nič sa nezapisuje na disk
+    return Response(
+        content=_csv_template_bytes(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=health_data_template.csv"},
+    )
 
 @router.get("/documents")
 async def list_documents():
     """List all uploaded documents"""
     try:
-        files = list(settings.RAW_DATA_DIR.glob("*"))
+        # os.scandir vracia DirEntry s cachovaným stat() - jeden syscall na
+        # súbor namiesto troch (is_file + 2x stat cez Path.glob)
+        with os.scandir(settings.RAW_DATA_DIR) as it:
+            entries = [(e.name, e.stat()) for e in it if e.is_file()]
         return {
-            "count": len(files),
+            "count": len(entries),
             "files": [
                 {
-                    "name": f.name,
-                    "size": f.stat().st_size,
-                    "created": f.stat().st_ctime
+                    "name": name,
+                    "size": st.st_size,
+                    "created": st.st_ctime
                 }
-                for f in files if f.is_file()
+                for name, st in entries
             ]
         }
     except Exception as e:
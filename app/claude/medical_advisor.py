@@ -1,18 +1,49 @@
 from typing import Dict, Optional
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
 import anthropic
+import orjson
 import os
 
 from app.config import settings
 
+# LRU cache Claude analýz - ML predikcie sú pre daný stav pacienta
+# deterministické, identický vstup znamená identický prompt, takže opakované
+# volanie netreba platiť (sekundy latencie, tokeny). Chybové odpovede sa
+# necachujú.
+_ANALYSIS_CACHE: "OrderedDict[bytes, Dict]" = OrderedDict()
+_ANALYSIS_CACHE_MAX = 256
+_analysis_cache_lock = threading.Lock()
+
+# Kľúče, ktoré sa menia pri každom volaní bez zmeny obsahu - pred hashom von
+_VOLATILE_KEYS = ('timestamp', 'generated_at')
+
+
+def _predictions_cache_key(ml_predictions: Dict):
+    """Stabilný hash predikcií (bez volatilných kľúčov), None ak sa nedá"""
+    try:
+        stripped = {k: v for k, v in ml_predictions.items() if k not in _VOLATILE_KEYS}
+        return blake2b(
+            orjson.dumps(stripped, option=orjson.OPT_SORT_KEYS),
+            digest_size=16,
+        ).digest()
+    except TypeError:
+        return None
+
+
 class MedicalAdvisor:
     """Claude AI integrácia pre medicínsku analýzu"""
     
     def __init__(self):
         self.api_key = settings.ANTHROPIC_API_KEY
         self.client = None
-        
+
         if self.api_key:
-            self.client = anthropic.Anthropic(api_key=self.api_key)
+            # Async klient - handlery sú async a sync volanie by blokovalo
+            # event loop na celú sekundovú latenciu modelu; zdieľaný httpx
+            # pool drží keep-alive spojenie medzi requestami
+            self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
     
     async def analyze_health_risks(self, ml_predictions: Dict) -> Dict:
         """
@@ -28,12 +59,21 @@ class MedicalAdvisor:
                 'instructions': 'Získajte API kľúč na https://console.anthropic.com/'
             }
         
+        # Identické predikcie → odpoveď z cache bez API volania
+        key = _predictions_cache_key(ml_predictions)
+        if key is not None:
+            with _analysis_cache_lock:
+                cached = _ANALYSIS_CACHE.get(key)
+                if cached is not None:
+                    _ANALYSIS_CACHE.move_to_end(key)
+                    return cached
+
         try:
             # Pripraviť prompt pre Claude
             prompt = self._build_health_analysis_prompt(ml_predictions)
             
             # Zavolať Claude API
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-haiku-20240307",
                 max_tokens=2000,
                 temperature=0.3,
@@ -47,12 +87,20 @@ class MedicalAdvisor:
             
             # Extrahovať odpoveď
             analysis = message.content[0].text
-            
-            return {
+
+            result = {
                 'ai_analysis': analysis,
                 'model': 'claude-3-5-sonnet',
                 'timestamp': message.id
             }
+
+            if key is not None:
+                with _analysis_cache_lock:
+                    _ANALYSIS_CACHE[key] = result
+                    if len(_ANALYSIS_CACHE) > _ANALYSIS_CACHE_MAX:
+                        _ANALYSIS_CACHE.popitem(last=False)
+
+            return result
         
         except Exception as e:
             return {
@@ -117,7 +165,7 @@ Odpoveď v slovenčine, prakticky a motivujúco.
 """
         
         try:
-            message = self.client.messages.create(
+            message = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2000,
                 messages=[{"role": "user", "content": prompt}]
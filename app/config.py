@@ -1,37 +1,45 @@
-from pydantic_settings import BaseSettings
+import os
+from dataclasses import dataclass
 from pathlib import Path
 
-class Settings(BaseSettings):
+from dotenv import load_dotenv
+
+_BASE_DIR = Path(__file__).parent.parent
+_DATA_DIR = _BASE_DIR / "data"
+
+# .env sa načíta raz tu - dataclass potom číta už naplnené os.environ
+load_dotenv(_BASE_DIR / ".env", encoding="utf-8")
+
+
+# Konfigurácia je za behu nemenná - frozen dataclass so slotmi znamená, že
+# čítanie atribútu je obyčajný slot lookup bez Pydantic deskriptorov
+@dataclass(frozen=True, slots=True)
+class Settings:
     # API Settings
-    BACKEND_HOST: str = "localhost"
-    BACKEND_PORT: int = 8000
-    
+    BACKEND_HOST: str = os.getenv("BACKEND_HOST", "localhost")
+    BACKEND_PORT: int = int(os.getenv("BACKEND_PORT", "8000"))
+
     # Security
-    SECRET_KEY: str = "change-this-in-production"
-    
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "change-this-in-production")
+
     # Claude API
-    ANTHROPIC_API_KEY: str = ""
-    
+    ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
+
     # Mistral API
-    MISTRAL_API_KEY: str = ""
-    
+    MISTRAL_API_KEY: str = os.getenv("MISTRAL_API_KEY", "")
+
     # OCR Settings
-    TESSERACT_LANG: str = "slk"
-    
+    TESSERACT_LANG: str = os.getenv("TESSERACT_LANG", "slk")
+
     # Paths
-    BASE_DIR: Path = Path(__file__).parent.parent
-    DATA_DIR: Path = BASE_DIR / "data"
-    RAW_DATA_DIR: Path = DATA_DIR / "raw"
-    PROCESSED_DATA_DIR: Path = DATA_DIR / "processed"
-    MODELS_DIR: Path = DATA_DIR / "models"
-    
+    BASE_DIR: Path = _BASE_DIR
+    DATA_DIR: Path = _DATA_DIR
+    RAW_DATA_DIR: Path = _DATA_DIR / "raw"
+    PROCESSED_DATA_DIR: Path = _DATA_DIR / "processed"
+    MODELS_DIR: Path = _DATA_DIR / "models"
+
     # ML Settings
-    MODEL_RETRAIN_THRESHOLD: float = 0.85
-    
-    class Config:
-        env_file = str(Path(__file__).parent.parent / ".env")
-        case_sensitive = True
-        env_file_encoding = 'utf-8'
+    MODEL_RETRAIN_THRESHOLD: float = float(os.getenv("MODEL_RETRAIN_THRESHOLD", "0.85"))
 
 settings = Settings()
 
@@ -10,6 +10,9 @@ from .models import (
     AppleHealthData,
     init_database,
     get_session,
+    bulk_insert_dicts,
+    get_cached_patient_id,
+    invalidate_patient_cache,
     create_default_patient,
 )
 
@@ -24,5 +27,8 @@ __all__ = [
     "AppleHealthData",
     "init_database",
     "get_session",
+    "bulk_insert_dicts",
+    "get_cached_patient_id",
+    "invalidate_patient_cache",
     "create_default_patient",
 ]
@@ -2,11 +2,13 @@
 Database models pre MedicalAI
 Lokálna SQLite databáza - všetky dáta zostávajú na vašom PC!
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, Date, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import create_engine, event, func, Column, Integer, String, Float, Date, DateTime, Text, Boolean, ForeignKey, JSON, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
+import functools
 import os
+import threading
 from pathlib import Path
 
 # Base class pre všetky modely
@@ -29,9 +31,11 @@ class Patient(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())  # udržiava DB, nie Python
     
-    # Relationships
+    # Relationships - lazy default: endpointy čítajú kolekcie cez Core
+    # selecty, ORM Patient sa načítava len ako one-row lookup a eager load
+    # by k nemu zbytočne hydratoval celé kolekcie
     health_records = relationship("HealthRecord", back_populates="patient")
     family_members = relationship("FamilyMember", back_populates="patient")
 
@@ -73,11 +77,16 @@ class FamilyMember(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())  # udržiava DB, nie Python
     
     # Relationships
     patient = relationship("Patient", back_populates="family_members")
 
+    __table_args__ = (
+        # Všetky family queries filtrujú podľa pacienta
+        Index('ix_family_patient', 'patient_id'),
+    )
+
 
 class HealthRecord(Base):
     """Zdravotné záznamy - z dokumentov alebo manuálne"""
@@ -109,11 +118,20 @@ class HealthRecord(Base):
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.now)
-    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
-    
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())  # udržiava DB, nie Python
+
     # Relationships
     patient = relationship("Patient", back_populates="health_records")
 
+    __table_args__ = (
+        # /health-records filtruje podľa pacienta (+ voliteľne metriky)
+        # a triedi podľa dátumu DESC LIMIT N - s indexom je to range scan
+        # v poradí indexu (SQLite ho pre DESC číta odzadu) bez full scanu
+        # a in-memory sortu
+        Index('ix_health_patient_date', 'patient_id', 'record_date'),
+        Index('ix_health_patient_metric_date', 'patient_id', 'metric_type', 'record_date'),
+    )
+
 
 class Document(Base):
     """Nahrané dokumenty (PDF, obrázky)"""
@@ -142,6 +160,11 @@ class Document(Base):
     uploaded_at = Column(DateTime, default=datetime.now)
     processed_at = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        # Dokumenty pacienta v časovom rozsahu bez full scanu
+        Index('ix_documents_patient_date', 'patient_id', 'document_date'),
+    )
+
 
 class GarminData(Base):
     """Dáta z Garmin hodinek"""
@@ -150,8 +173,8 @@ class GarminData(Base):
     id = Column(Integer, primary_key=True)
     patient_id = Column(Integer, ForeignKey('patients.id'))
     
-    # Dátum merania
-    record_date = Column(Date, unique=True)
+    # Dátum merania (unikátny per pacient - viď __table_args__)
+    record_date = Column(Date)
     
     # Srdce
     resting_heart_rate = Column(Integer, nullable=True)
@@ -184,6 +207,13 @@ class GarminData(Base):
     # Timestamps
     synced_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # Jeden denný súhrn na pacienta a deň; globálne unique record_date
+        # by bránilo viacerým pacientom zdieľať dátum. Constraint zároveň
+        # slúži ako index pre range queries podľa (patient_id, record_date).
+        UniqueConstraint('patient_id', 'record_date', name='uq_garmin_patient_date'),
+    )
+
 
 class CalendarEvent(Base):
     """Udalosti z Google Calendar"""
@@ -211,6 +241,11 @@ class CalendarEvent(Base):
     # Timestamps
     synced_at = Column(DateTime, default=datetime.now)
 
+    __table_args__ = (
+        # Korelácie čítajú udalosti pacienta v časovom okne
+        Index('ix_calendar_patient_start', 'patient_id', 'start_time'),
+    )
+
 
 class AppleHealthData(Base):
     """Apple Health dáta z iPhone"""
@@ -250,32 +285,142 @@ class AppleHealthData(Base):
     # Relationship
     patient = relationship("Patient")
 
+    __table_args__ = (
+        # Dashboard a dedup queries filtrujú podľa (record_type, start_date) -
+        # bez indexu je to full table scan nad 1M+ riadkami
+        Index('ix_ahd_type_start', 'record_type', 'start_date'),
+        # Range queries "dáta pacienta medzi X a Y" naprieč typmi
+        Index('ix_ahd_patient_start', 'patient_id', 'start_date'),
+        # Duplicitu rieši aj samotný engine (INSERT OR IGNORE pri importe)
+        UniqueConstraint('record_type', 'start_date', 'value', 'unit', 'patient_id',
+                         name='uq_ahd_dedup'),
+    )
+
 
 # Database setup funkcie
+@functools.lru_cache(maxsize=1)
 def get_database_path():
-    """Získať cestu k databáze"""
+    """Získať cestu k databáze (resolvuje a mkdir-uje sa len raz)"""
     # Databáza bude v backend/data/medical_ai.db
     base_dir = Path(__file__).parent.parent.parent  # backend/
     db_dir = base_dir / "data" / "database"
     db_dir.mkdir(parents=True, exist_ok=True)
-    
+
     db_path = db_dir / "medical_ai.db"
     return f"sqlite:///{db_path}"
 
 
+# Engine aj sessionmaker sa vytvárajú raz na proces - každé get_session()
+# predtým stavalo nový engine (parse URL, nový pool, nový file handle na
+# .db/.db-wal/.db-shm)
+_ENGINE = None
+_SessionLocal = None
+_engine_lock = threading.Lock()
+
+
+def _create_engine():
+    """Vytvoriť engine s SQLite PRAGMA ladením pre hromadné zápisy"""
+    engine = create_engine(
+        get_database_path(),
+        echo=False,
+        future=True,
+        # Sessions bežia aj vo worker threadoch (asyncio.to_thread) -
+        # spojenia z poolu musia byť použiteľné naprieč threadmi
+        connect_args={"check_same_thread": False},
+        pool_size=5,
+        max_overflow=10,
+        # insertmanyvalues: dávkové INSERT-y (aj s RETURNING) idú po
+        # stránkach 1000 riadkov v jednom statemente namiesto riadku po
+        # riadku; strop drží pamäť aj dĺžku SQL pod kontrolou
+        insertmanyvalues_page_size=1000,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_conn, connection_record):
+        # WAL: čítanie neblokuje import; synchronous=NORMAL: fsync len pri
+        # checkpointe namiesto každého commitu; 64 MB page cache +
+        # temp_store v RAM pre agregácie; mmap šetrí read() syscally
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA cache_size=-65536")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+    return engine
+
+
+def _get_engine():
+    """Vráti zdieľaný engine (lenivá inicializácia, thread-safe)"""
+    global _ENGINE, _SessionLocal
+    if _ENGINE is None:
+        with _engine_lock:
+            if _ENGINE is None:
+                engine = _create_engine()
+                _SessionLocal = sessionmaker(
+                    bind=engine, expire_on_commit=False, autoflush=False
+                )
+                _ENGINE = engine
+    return _ENGINE
+
+
 def init_database():
     """Inicializovať databázu - vytvoriť všetky tabuľky"""
-    engine = create_engine(get_database_path(), echo=False)
+    engine = _get_engine()
     Base.metadata.create_all(engine)
     print(f"[DATABASE] Initialized at: {get_database_path()}")
     return engine
 
 
 def get_session():
-    """Získať databázovú session"""
-    engine = create_engine(get_database_path(), echo=False)
-    Session = sessionmaker(bind=engine)
-    return Session()
+    """Získať databázovú session zo zdieľaného enginu
+
+    expire_on_commit=False: objekty sa po commite nereloadujú (žiadne
+    SELECT-y navyše); autoflush=False: flush riadi explicitne caller,
+    nie každá query uprostred rozrobenej dávky.
+    """
+    _get_engine()
+    return _SessionLocal()
+
+
+def bulk_insert_dicts(model, rows, batch_size=1000):
+    """Hromadný INSERT plain dictov cez Core executemany
+
+    Pre dávkové importy (Garmin história, Apple Health export) je jeden
+    multi-row INSERT na batch rádovo rýchlejší než session.add + commit
+    po riadku - žiadna ORM hydratácia, žiadny per-row roundtrip. Celá
+    dávka beží v jednej transakcii (engine.begin).
+    """
+    if not rows:
+        return 0
+
+    with _get_engine().begin() as conn:
+        for i in range(0, len(rows), batch_size):
+            conn.execute(model.__table__.insert(), rows[i:i + batch_size])
+
+    return len(rows)
+
+
+# Cache ID hlavného pacienta - single-patient aplikácia, ID sa po vytvorení
+# nemení, takže ho netreba SELECT-ovať na začiatku každého endpointu
+_patient_id = None
+
+
+def get_cached_patient_id(session):
+    """Vráti ID hlavného pacienta (cachované na úrovni procesu)"""
+    global _patient_id
+    if _patient_id is None:
+        patient = session.query(Patient).first()
+        if patient is not None:
+            _patient_id = patient.id
+    return _patient_id
+
+
+def invalidate_patient_cache():
+    """Zrušiť cache ID pacienta (po zmene/vytvorení pacienta)"""
+    global _patient_id
+    _patient_id = None
 
 
 # Convenience funkcie
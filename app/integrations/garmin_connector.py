@@ -151,17 +151,26 @@ class GarminConnector:
         
         if date is None:
             date = datetime.now().strftime("%Y-%m-%d")
-        
-        summary = {
+
+        # Päť nezávislých API volaní naraz - Garmin klient drží jednu
+        # autentifikovanú session, takže sa zdieľa spojenie a deň trvá
+        # max(volanie) namiesto súčtu piatich round-tripov
+        heart_rate, sleep, stress, steps, body_composition = await asyncio.gather(
+            self.get_heart_rate_data(date),
+            self.get_sleep_data(date),
+            self.get_stress_data(date),
+            self.get_steps_data(date),
+            self.get_body_composition(date),
+        )
+
+        return {
             "date": date,
-            "heart_rate": await self.get_heart_rate_data(date),
-            "sleep": await self.get_sleep_data(date),
-            "stress": await self.get_stress_data(date),
-            "steps": await self.get_steps_data(date),
-            "body_composition": await self.get_body_composition(date),
+            "heart_rate": heart_rate,
+            "sleep": sleep,
+            "stress": stress,
+            "steps": steps,
+            "body_composition": body_composition,
         }
-        
-        return summary
     
     async def get_historical_data(self, days: int = 30) -> List[Dict[str, Any]]:
         """
@@ -1,7 +1,10 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from typing import List, Optional
+import logging
+import logging.handlers
+import queue
 import uvicorn
 from pathlib import Path
 
@@ -9,10 +12,32 @@ from app.api import health, upload, analysis, predictions, chat, integrations, m
 from app.config import settings
 from app.database import init_database, create_default_patient
 
+# Logovanie cez QueueHandler - request thread len vloží záznam do fronty,
+# formátovanie a flush na stderr robí QueueListener v pozadí (žiadna
+# kontencia na stdout locku v hot path)
+_log_queue: "queue.SimpleQueue" = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler(), respect_handler_level=True
+)
+
+
+def _setup_logging():
+    root = logging.getLogger()
+    if not any(isinstance(h, logging.handlers.QueueHandler) for h in root.handlers):
+        root.addHandler(logging.handlers.QueueHandler(_log_queue))
+        root.setLevel(logging.INFO)
+        _log_listener.start()
+
+
+_setup_logging()
+
 app = FastAPI(
     title="MedicalAI API",
     description="API for medical health analysis and predictions",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializuje odpovede (vrátane date/datetime) v C kóde -
+    # endpointy nemusia ručne volať .isoformat()
+    default_response_class=ORJSONResponse,
 )
 
 # Initialize database on startup
@@ -26,6 +51,15 @@ async def startup_event():
     except Exception as e:
         print(f"[STARTUP ERROR] Failed to initialize database: {e}")
 
+    # Predhriatie ML/Claude singletonov - konštrukcia prebehne tu namiesto
+    # prvého requestu na /api/predictions
+    predictions.warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Doflushovať log queue pri vypnutí"""
+    _log_listener.stop()
+
 # CORS middleware pre React frontend
 app.add_middleware(
     CORSMiddleware,
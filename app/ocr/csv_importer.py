@@ -1,4 +1,5 @@
 import csv
+import io
 import json
 from pathlib import Path
 from datetime import datetime
@@ -61,9 +62,16 @@ class CSVImporter:
         
         print(f"Imported {len(metrics)} metrics from CSV to {output_file}")
     
-    def create_template_csv(self, output_path: Path):
-        """Vytvorí vzorový CSV súbor"""
-        template_data = [
+    def build_template_bytes(self) -> bytes:
+        """Vygeneruje vzorový CSV v pamäti - bez zápisu na disk"""
+        buffer = io.StringIO(newline='')
+        writer = csv.DictWriter(buffer, fieldnames=['date', 'metric', 'value', 'unit'])
+        writer.writeheader()
+        writer.writerows(self._template_data())
+        return buffer.getvalue().encode('utf-8')
+
+    def _template_data(self) -> List[Dict]:
+        return [
             {'date': '2024-01-15', 'metric': 'blood_pressure_systolic', 'value': '125', 'unit': 'mmHg'},
             {'date': '2024-01-15', 'metric': 'blood_pressure_diastolic', 'value': '82', 'unit': 'mmHg'},
             {'date': '2024-01-15', 'metric': 'glucose', 'value': '5.4', 'unit': 'mmol/L'},
@@ -73,10 +81,8 @@ class CSVImporter:
             {'date': '2024-01-15', 'metric': 'triglycerides', 'value': '1.5', 'unit': 'mmol/L'},
             {'date': '2024-01-15', 'metric': 'bmi', 'value': '24.5', 'unit': ''},
         ]
-        
-        with open(output_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['date', 'metric', 'value', 'unit'])
-            writer.writeheader()
-            writer.writerows(template_data)
-        
+
+    def create_template_csv(self, output_path: Path):
+        """Vytvorí vzorový CSV súbor na disku"""
+        output_path.write_bytes(self.build_template_bytes())
         print(f"Template CSV created at {output_path}")